@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+'''Compare date parsing through arrow with `embypy.utils.parse_datetime`
+
+Sorts synthetic episodes by premiere date the way report code does
+(reading `premier_date` several times per object).
+
+usage: PYTHONPATH=. python benchmarks/dates.py [count]
+'''
+
+import sys
+import time
+
+import arrow
+
+from embypy import Emby
+from embypy.objects import parse_dates
+from embypy.utils.dates import parse_datetime
+
+
+def timestamps(count):
+    return [
+        '20{:02d}-{:02d}-{:02d}T{:02d}:30:00.0000000Z'.format(
+            i % 25, i % 12 + 1, i % 28 + 1, i % 24,
+        )
+        for i in range(count)
+    ]
+
+
+def timed(name, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    print('{:<28} {:>8.3f}s'.format(name, time.perf_counter() - start))
+    return result
+
+
+def main(count=200000):
+    stamps = timestamps(count)
+    slow = timed('arrow.get', lambda: [arrow.get(t).datetime for t in stamps])
+    fast = timed('parse_datetime', lambda: [parse_datetime(t) for t in stamps])
+    assert slow == fast
+
+    emby = Emby('http://localhost:8096', api_key='x', userid='x')
+    episodes = emby.process([
+        {'Id': str(i), 'Type': 'Episode', 'PremiereDate': t}
+        for i, t in enumerate(stamps)
+    ])
+
+    def by_date(items):
+        return sorted(items, key=lambda x: x.premier_date)
+
+    timed('sort by premier_date', by_date, episodes)
+    timed('sort again (memoized)', by_date, episodes)
+    timed('parse_dates (bulk)', parse_dates, episodes)
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
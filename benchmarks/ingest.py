@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+'''Report the time `process` takes per object, grouped by type
+
+Creates objects from synthetic pages (the same ones `memory.py` uses),
+then processes the pages again, which merges into the cached objects.
+Pages are decoded with the connector's decoder (typed structs for the
+`typed` config, which needs msgspec) before the clock starts.
+With `max_us` given, exits with status 1 if any step took longer per
+object, so it can be used as a check.
+
+usage: PYTHONPATH=. python benchmarks/ingest.py [count] [max_us]
+'''
+
+import gc
+import sys
+import json
+import time
+import asyncio
+
+from embypy import Emby
+from embypy.utils.schema import msgspec
+
+from memory import CONFIGS, SHAPES, fake_item
+
+
+async def measure(emby, item_type, count):
+    page = json.dumps({
+        'Items': [fake_item(i, item_type) for i in range(count)],
+    })
+    timings = []
+    for _ in ('create', 'merge'):
+        items = emby.connector.loads(page)['Items']
+        gc.collect()
+        start = time.perf_counter()
+        await emby.process(items)
+        timings.append((time.perf_counter() - start) / count * 10**6)
+    return timings
+
+
+def main(count=20000, max_us=None):
+    configs = dict(CONFIGS)
+    if msgspec is not None:
+        configs['typed'] = {'typed': True}
+    slow = []
+    for name, config in configs.items():
+        print(name)
+        for item_type in SHAPES:
+            emby = Emby(
+                'http://localhost:8096', api_key='x', userid='x', **config
+            )
+            create, merge = asyncio.run(measure(emby, item_type, count))
+            print('  {:<12} create {:>6.1f} us/obj  merge {:>6.1f} us/obj'
+                  .format(item_type, create, merge))
+            if max_us is not None and max(create, merge) > max_us:
+                slow.append((name, item_type))
+    if slow:
+        print('over {} us/obj: {}'.format(max_us, slow))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+'''Report the memory used per cached object, grouped by type
+
+Decodes synthetic pages shaped like the ones emby returns from
+`/Users/{UserId}/Items`, processes them and measures what stays
+allocated with tracemalloc.
+
+usage: PYTHONPATH=. python benchmarks/memory.py [count]
+'''
+
+import sys
+import json
+import asyncio
+import tracemalloc
+
+from embypy import Emby
+
+
+def hex_id(i):
+    return '{:032x}'.format(i)
+
+
+def media_source(i, container, size, streams):
+    return [{
+        'Id': hex_id(i),
+        'Protocol': 'File',
+        'Container': container,
+        'Size': size,
+        'Path': '/media/{}.{}'.format(i, container),
+        'MediaStreams': streams,
+    }]
+
+
+VIDEO_STREAMS = [
+    {'Type': 'Video', 'Codec': 'h264', 'Width': 1920, 'Height': 1080,
+     'Index': 0, 'IsDefault': True},
+    {'Type': 'Audio', 'Codec': 'aac', 'Channels': 6, 'Language': 'eng',
+     'Index': 1, 'IsDefault': True},
+    {'Type': 'Subtitle', 'Codec': 'srt', 'Language': 'eng', 'Index': 2},
+]
+
+AUDIO_STREAMS = [
+    {'Type': 'Audio', 'Codec': 'flac', 'Channels': 2, 'SampleRate': 44100,
+     'Index': 0, 'IsDefault': True},
+]
+
+
+def movie(i):
+    return {
+        'Name': 'Movie {}'.format(i),
+        'OriginalTitle': 'Movie {}'.format(i),
+        'MediaType': 'Video',
+        'ProductionYear': 1990 + i % 30,
+        'OfficialRating': 'PG-13',
+        'CommunityRating': 7.1,
+        'CriticRating': 80,
+        'Overview': 'A movie about the number {}. '.format(i) * 4,
+        'Genres': ['Drama', 'Comedy'],
+        'Tags': ['4k'] if i % 5 == 0 else [],
+        'Studios': [{'Name': 'Studio {}'.format(i % 50), 'Id': str(i % 50)}],
+        'ProviderIds': {'Imdb': 'tt{:07d}'.format(i), 'Tmdb': str(i)},
+        'RunTimeTicks': 72000000000,
+        'Path': '/media/movies/Movie {0}/Movie {0}.mkv'.format(i),
+        'MediaSources': media_source(i, 'mkv', 8 * 10**9, VIDEO_STREAMS),
+    }
+
+
+def episode(i):
+    series, season = i // 200, i // 20 % 10
+    return {
+        'Name': 'Episode {}'.format(i % 20 + 1),
+        'MediaType': 'Video',
+        'SeriesName': 'Series {}'.format(series),
+        'SeriesId': hex_id(10**7 + series),
+        'SeasonName': 'Season {}'.format(season + 1),
+        'SeasonId': hex_id(10**8 + i // 20),
+        'ParentId': hex_id(10**8 + i // 20),
+        'IndexNumber': i % 20 + 1,
+        'ParentIndexNumber': season + 1,
+        'Overview': 'Episode {} of the season. '.format(i % 20 + 1) * 3,
+        'ProviderIds': {'Tvdb': str(10**6 + i)},
+        'RunTimeTicks': 26000000000,
+        'Path': '/media/tv/Series {}/S{:02d}E{:02d}.mkv'.format(
+            series, season + 1, i % 20 + 1,
+        ),
+        'MediaSources': media_source(i, 'mkv', 10**9, VIDEO_STREAMS),
+    }
+
+
+def audio(i):
+    album, artist = i // 12, i // 120
+    return {
+        'Name': 'Track {}'.format(i % 12 + 1),
+        'MediaType': 'Audio',
+        'Album': 'Album {}'.format(album),
+        'AlbumId': hex_id(10**7 + album),
+        'ParentId': hex_id(10**7 + album),
+        'AlbumArtist': 'Artist {}'.format(artist),
+        'Artists': ['Artist {}'.format(artist)],
+        'ArtistItems': [
+            {'Name': 'Artist {}'.format(artist), 'Id': hex_id(10**8 + artist)}
+        ],
+        'AlbumArtists': [
+            {'Name': 'Artist {}'.format(artist), 'Id': hex_id(10**8 + artist)}
+        ],
+        'IndexNumber': i % 12 + 1,
+        'ParentIndexNumber': 1,
+        'ProductionYear': 1970 + artist % 50,
+        'Genres': ['Rock'],
+        'RunTimeTicks': 2400000000,
+        'Path': '/media/music/Artist {}/Album {}/{:02d}.flac'.format(
+            artist, album, i % 12 + 1,
+        ),
+        'MediaSources': media_source(i, 'flac', 3 * 10**7, AUDIO_STREAMS),
+    }
+
+
+def series(i):
+    return {
+        'Name': 'Series {}'.format(i),
+        'OriginalTitle': 'Series {}'.format(i),
+        'Status': 'Ended' if i % 3 else 'Continuing',
+        'AirDays': ['Monday'],
+        'AirTime': '8:00 PM',
+        'ProductionYear': 1990 + i % 30,
+        'OfficialRating': 'TV-14',
+        'CommunityRating': 8.2,
+        'Overview': 'A series about the number {}. '.format(i) * 4,
+        'Genres': ['Drama'],
+        'Studios': [{'Name': 'Network {}'.format(i % 20), 'Id': str(i % 20)}],
+        'ProviderIds': {'Tvdb': str(i), 'Imdb': 'tt{:07d}'.format(i)},
+        'ChildCount': 5,
+        'RecursiveItemCount': 100,
+        'CumulativeRunTimeTicks': 2600000000000,
+        'Path': '/media/tv/Series {}'.format(i),
+    }
+
+
+# representative fields of each type, as listed with `Fields=...`
+SHAPES = {
+    'Movie':	movie,
+    'Episode':	episode,
+    'Audio':	audio,
+    'Series':	series,
+}
+
+
+def fake_item(i, item_type):
+    item = SHAPES[item_type](i)
+    item.update({
+        'Id': hex_id(i),
+        'Type': item_type,
+        'ServerId': 'a' * 32,
+        'PremiereDate': '2019-05-03T00:00:00.0000000Z',
+        'DateCreated': '2020-01-01T12:30:00.0000000Z',
+        'UserData': {
+            'Played': i % 3 == 0, 'PlayCount': i % 3,
+            'PlaybackPositionTicks': 0, 'IsFavorite': i % 50 == 0,
+        },
+    })
+    item.setdefault('ParentId', hex_id(i // 20))
+    return item
+
+
+async def measure(emby, item_type, count, page_size=200):
+    pages = [
+        json.dumps({
+            'Items': [
+                fake_item(i, item_type)
+                for i in range(start, min(start + page_size, count))
+            ],
+            'TotalRecordCount': count,
+        })
+        for start in range(0, count, page_size)
+    ]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for page in pages:
+        await emby.process(json.loads(page))
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert len(emby.known_objects) == count
+    return (after - before) / count
+
+
+CONFIGS = {
+    'plain':	{'intern_strings': False},
+    'interned':	{},
+    'compact':	{'prune_fields': ['MediaSources'], 'compact_ids': True},
+}
+
+
+def main(count=10000):
+    for name, config in CONFIGS.items():
+        print(name)
+        for item_type in SHAPES:
+            emby = Emby(
+                'http://localhost:8096', api_key='x', userid='x', **config
+            )
+            per_obj = asyncio.run(measure(emby, item_type, count))
+            print('  {:<12} {:>8.0f} B/obj'.format(item_type, per_obj))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
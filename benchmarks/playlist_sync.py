@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+'''Time `Playlist.sync` on large playlists against a simulated server
+
+The connector's requests are answered in memory after a fixed delay, so
+the numbers show the cost of the diff plus the number and overlap of
+requests, not the speed of a real server.
+
+usage: PYTHONPATH=. python benchmarks/playlist_sync.py [count] [latency_ms]
+'''
+
+import sys
+import time
+import asyncio
+
+from embypy import Emby
+
+
+def item_id(i):
+    return '{:032x}'.format(i)
+
+
+class FakeServer:
+    '''playlist endpoints of one playlist, answering after `latency`'''
+    def __init__(self, count, latency):
+        self.entries = [('e{}'.format(i), item_id(i)) for i in range(count)]
+        self.latency = latency
+        self.requests = 0
+        self.next_entry = count
+
+    async def getJson(self, path, StartIndex=0, Limit=200, **query):
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        page = self.entries[StartIndex:StartIndex + Limit]
+        return {
+            'Items': [
+                {'Id': i, 'PlaylistItemId': e, 'Type': 'Audio', 'Name': i}
+                for e, i in page
+            ],
+            'TotalRecordCount': len(self.entries),
+        }
+
+    async def post(self, path, data={}, **query):
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        for i in data['Ids'].split(','):
+            self.entries.append(('e{}'.format(self.next_entry), i))
+            self.next_entry += 1
+        return 204, ''
+
+    async def delete(self, path, EntryIds='', **query):
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        removed = set(EntryIds.split(','))
+        self.entries = [e for e in self.entries if e[0] not in removed]
+        return 204
+
+
+async def run(count, latency, changed):
+    server = FakeServer(count, latency)
+    emby = Emby('http://localhost:8096', api_key='x', userid='x')
+    emby.connector.getJson = server.getJson
+    emby.connector.post = server.post
+    emby.connector.delete = server.delete
+    playlist = await emby.process(
+        {'Id': item_id(10**9), 'Type': 'Playlist', 'Name': 'bench'}
+    )
+
+    # drop the first `changed` tracks, append as many new ones
+    wanted = [item_id(i) for i in range(changed, count + changed)]
+    start = time.perf_counter()
+    diff = await playlist.sync(wanted)
+    elapsed = time.perf_counter() - start
+
+    assert sorted(i for _, i in server.entries) == sorted(wanted)
+    print('{:>6} tracks {:>6} changed {:>8.3f}s {:>5} requests'.format(
+        count, len(diff.added) + len(diff.removed), elapsed, server.requests,
+    ))
+
+
+def main(count=10000, latency_ms=20):
+    for changed in (0, count // 100, count // 10, count // 2):
+        asyncio.run(run(count, latency_ms / 1000, changed))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -3,8 +3,12 @@ from simplejson.scanner import JSONDecodeError
 import asyncio
 
 from embypy import objects
-from embypy.utils import Connector
+from embypy.objects.folders import PLAYLIST_CHUNK_SIZE
+from embypy.utils import Connector, deadline
 from embypy.utils.asyncio import async_func
+from embypy.utils.bulk import run_bulk
+from embypy.utils.table import LibraryTable
+from embypy.utils.query import ItemQuery
 
 
 class Emby(objects.EmbyObject):
@@ -26,6 +30,20 @@ class Emby(objects.EmbyObject):
     password : str, optional
       password for user to login as
 
+    cache : str, optional
+      `'lru'` (default) or `'weak'`, how fetched objects are kept
+    cache_size : int, optional
+      max number of objects to keep cached (lru only)
+    cache_ttl : float, optional
+      seconds to keep objects cached (lru only)
+
+    partition : str, optional
+      split full library listings (`movies`, `songs`, ...) into
+      slices that are fetched concurrently - `'parent'` (per library),
+      `'prefix'` (by sort name) or `'year'`, default None (single crawl)
+    crawl_concurrency : int, optional
+      number of slices fetched at once (default 4)
+
     Attributes
     ----------
     connector : embypy.utils.connector.Connector
@@ -36,6 +54,9 @@ class Emby(objects.EmbyObject):
         super().__init__({'ItemId': '', 'Name': ''}, connector)
         self._partial_cache = {}
         self._cache_lock = asyncio.Condition()
+        self._facet_cache = {}
+        self.partition = kargs.get('partition')
+        self.crawl_concurrency = kargs.get('crawl_concurrency', 4)
 
     @async_func
     async def info(self, obj_id=None):
@@ -71,7 +92,8 @@ class Emby(objects.EmbyObject):
             'Audio': 3,
             'Person': 4
         },
-        strict_sort=False
+        strict_sort=False,
+        local=None,
     ):
         '''Sends a search request to emby, returns results
 
@@ -88,27 +110,60 @@ class Emby(objects.EmbyObject):
         strict_sort : bool
           if True, then only item types in the keys of sortmap will be
           included in the results
+        local : bool, optional
+          use the local search index (see `search_index` option) for
+          item types that have been listed completely, the server is
+          only asked about the remaining types.
+          Default is to do so whenever the index is enabled.
 
         Returns
         -------
         list
           list of emby objects
         '''
-        search_params = {
-            'remote'     : False,
-            'searchTerm' : query
-        }
+        index = self.known_objects.search
+        if local is None:
+            local = index is not None
+        if local and index is None:
+            raise RuntimeError('search index is not enabled')
+
+        items = []
+        complete = set(index.complete_types) if local else set()
         if strict_sort:
-            search_params['IncludeItemTypes'] = ','.join(sort_map.keys())
-
-        json = await self.connector.getJson('/Search/Hints/', **search_params)
-        items = await self.process(json["SearchHints"])
+            complete &= set(sort_map)
+        if complete:
+            items = self.known_objects.search_items(query, types=complete)
+
+        remaining = [t for t in sort_map if t not in complete]
+        if not strict_sort or remaining:
+            search_params = {
+                'remote'     : False,
+                'searchTerm' : query
+            }
+            if strict_sort:
+                search_params['IncludeItemTypes'] = ','.join(remaining)
+            elif complete:
+                search_params['ExcludeItemTypes'] = ','.join(complete)
+
+            json = await self.connector.getJson(
+                '/Search/Hints/', **search_params
+            )
+            items.extend(await self.process(json["SearchHints"]))
 
         m_size = len(sort_map)
         return sorted(items, key=lambda x: sort_map.get(x.type, m_size))
 
+    @staticmethod
+    def _paging(limit, start):
+        params = {'Limit': limit} if limit else {}
+        if start:
+            params['StartIndex'] = start
+        return params
+
     @async_func
-    async def latest(self, userId=None, itemTypes='', groupItems=False):
+    async def latest(
+        self, userId=None, itemTypes='', groupItems=False, limit=None
+    ):
         '''returns list of latest items
 
         |coro|
@@ -122,6 +177,8 @@ class Emby(objects.EmbyObject):
           if provided, then the list will only include items
           if that type - gets passed to the emby api
           see https://github.com/MediaBrowser/Emby/wiki/Item-Types
+        limit : int, optional
+          max number of items (default - server default)
 
         Returns
         -------
@@ -134,11 +191,12 @@ class Emby(objects.EmbyObject):
             userId=userId,
             IncludeItemTypes=itemTypes,
             GroupItems=groupItems,
+            **self._paging(limit, 0)
         )
-        return await self.process(json)
+        return await self.process(json, userId)
 
     @async_func
-    async def nextUp(self, userId=None):
+    async def nextUp(self, userId=None, limit=None, start=0):
         '''returns list of items marked as `next up`
 
         |coro|
@@ -148,6 +206,10 @@ class Emby(objects.EmbyObject):
         userId : str
           if provided, then the list returned is
           the one that that use will see.
+        limit : int, optional
+          max number of items (default - all)
+        start : int, optional
+          index of the first item (for paging)
 
         Returns
         -------
@@ -159,9 +221,94 @@ class Emby(objects.EmbyObject):
             '/Shows/NextUp',
             pass_uid=True,
             remote=False,
-            userId=userId
+            userId=userId,
+            **self._paging(limit, start)
+        )
+        return await self.process(json, userId)
+
+    @async_func
+    async def resume(self, userId=None, itemTypes='', limit=None, start=0):
+        '''returns list of partially played items (continue watching)
+
+        |coro|
+
+        Parameters
+        ----------
+          same as `nextUp`, plus
+        itemTypes: str
+          only include items of these (comma separated) types
+
+        Returns
+        -------
+        list
+          the items that will appear as resumable
+          (for user if id was given)
+        '''
+        json = await self.connector.getJson(
+            '/Users/{UserId}/Items/Resume',
+            remote=False,
+            userId=userId,
+            Recursive='true',
+            IncludeItemTypes=itemTypes,
+            **self._paging(limit, start)
         )
-        return await self.process(json)
+        return await self.process(json, userId)
+
+    async def _for_users(self, func, user_ids, **kargs):
+        user_ids = list(user_ids)
+        results = await asyncio.gather(
+            *(func(userId=user_id, **kargs) for user_id in user_ids)
+        )
+        return dict(zip(user_ids, results))
+
+    @async_func
+    async def latest_many(self, user_ids, **kargs):
+        '''`latest` for several users at once
+
+        |coro|
+
+        The requests run concurrently (bounded by the connector's
+        `max_requests`), items shared between users are the same
+        objects and each user's play state is kept separately
+        (see `EmbyObject.user_data`).
+
+        Parameters
+        ----------
+        user_ids : array_like
+          emby ids of the users
+        kargs :
+          passed to `latest` (`itemTypes`, `groupItems`, `limit`)
+
+        Returns
+        -------
+        dict
+          user id -> list of items
+        '''
+        return await self._for_users(self.latest, user_ids, **kargs)
+
+    @async_func
+    async def nextUp_many(self, user_ids, **kargs):
+        '''`nextUp` for several users at once
+
+        |coro|
+
+        See Also
+        --------
+          latest_many :
+        '''
+        return await self._for_users(self.nextUp, user_ids, **kargs)
+
+    @async_func
+    async def resume_many(self, user_ids, **kargs):
+        '''`resume` for several users at once
+
+        |coro|
+
+        See Also
+        --------
+          latest_many :
+        '''
+        return await self._for_users(self.resume, user_ids, **kargs)
 
     @async_func
     async def update(self):
@@ -204,21 +351,749 @@ class Emby(objects.EmbyObject):
         name : str
           name of new playlist
         songs : array_like
-          list of song ids to add to playlist
+          list of songs (or their ids) to add to playlist
+
+        Returns
+        -------
+        embypy.objects.Playlist
+          the new playlist
+
+        Notes
+        -----
+        large lists are added in several requests
+        (see `embypy.objects.Playlist.add_items`)
         '''
+        ids = [self._item_key(song) for song in songs]
         data = {'Name': name}
-        ids = [i.id for i in (await self.process(songs))]
-
         if ids:
-            data['Ids'] = ','.join(ids)
+            data['Ids'] = ','.join(ids[:PLAYLIST_CHUNK_SIZE])
 
-        # TODO - return playlist(s?)
-        await self.connector.post(
+        resp = await self.connector.postJson(
             '/Playlists',
             data=data,
             pass_uid=True,
             remote=False
         )
+        playlist = await self.process(resp.get('Id'))
+        if playlist and ids[PLAYLIST_CHUNK_SIZE:]:
+            await playlist.add_items(*ids[PLAYLIST_CHUNK_SIZE:])
+        return playlist
+
+    def query(self, *types):
+        '''start a server side filtered item query
+
+        Parameters
+        ----------
+        types : str
+          item types to include (e.g. `'Movie'`, `'Episode'`),
+          none for every type
+
+        Returns
+        -------
+        embypy.utils.query.ItemQuery
+          add filters with its methods, then use `count`, `page`,
+          `stream` or `all` to run it
+
+        Examples
+        --------
+        >>> movies = await emby.query('Movie').genres('Science Fiction') \\
+        ...     .years(2019).min_rating(7).all()
+        '''
+        return ItemQuery(self, types)
+
+    def find_by_provider_id(self, provider, provider_id):
+        '''cached objects with a given provider id
+
+        Parameters
+        ----------
+        provider : str
+          e.g. `'Tmdb'`, `'Imdb'`, `'Tvdb'` (case insensitive)
+        provider_id : str
+          id of the item at that provider
+
+        Returns
+        -------
+        list
+          matching objects that have already been fetched
+
+        See Also
+        --------
+          embypy.utils.ObjectCache.find :
+        '''
+        return self.known_objects.find('provider', (provider, provider_id))
+
+    def find_by_path(self, path):
+        '''cached object with the given file path (or None)'''
+        found = self.known_objects.find('path', path)
+        return found[0] if found else None
+
+    def cached_children(self, parent_id):
+        '''cached objects whose parent has the given id'''
+        return self.known_objects.find('parent', parent_id)
+
+    def cached_episodes(self, series_id):
+        '''cached episodes (and seasons) of the series with the given id'''
+        return self.known_objects.find('series', series_id)
+
+    def cached_songs(self, album_id):
+        '''cached songs of the album with the given id'''
+        return self.known_objects.find('album', album_id)
+
+    async def _get_facet(self, path, types, parent_id, force, **params):
+        key = (path, types, parent_id, tuple(sorted(params.items())))
+        if not force and key in self._facet_cache:
+            return self._facet_cache[key]
+        if parent_id:
+            params['ParentId'] = parent_id
+        items = await self._get_list(
+            types, path=path, pass_uid=True, **params
+        )
+        if not deadline.expired():
+            self._facet_cache[key] = items
+        return items
+
+    @async_func
+    async def get_genres(self, types='', parent_id=None, force=False):
+        '''genres used by items in the library
+
+        |coro|
+
+        Parameters
+        ----------
+        types : str, optional
+          only count items of these (comma separated) types,
+          e.g. `'Movie'` or `'Audio'`
+        parent_id : str, optional
+          only count items under this folder/library
+        force : bool, optional
+          ignore previously cached results
+
+        Returns
+        -------
+        list
+          genre objects (:class:`embypy.objects.EmbyObject`)
+        '''
+        return await self._get_facet('/Genres', types, parent_id, force)
+
+    @async_func
+    async def get_studios(self, types='', parent_id=None, force=False):
+        '''studios used by items in the library
+
+        |coro|
+
+        Parameters
+        ----------
+          same as `get_genres`
+
+        Returns
+        -------
+        list
+          studio objects (:class:`embypy.objects.EmbyObject`)
+        '''
+        return await self._get_facet('/Studios', types, parent_id, force)
+
+    @async_func
+    async def get_years(self, types='', parent_id=None, force=False):
+        '''production years used by items in the library
+
+        |coro|
+
+        Parameters
+        ----------
+          same as `get_genres`
+
+        Returns
+        -------
+        list
+          of ints, sorted
+        '''
+        items = await self._get_facet('/Years', types, parent_id, force)
+        return sorted(int(i.name) for i in items if i.name.isdigit())
+
+    @async_func
+    async def get_tags(self, types='', parent_id=None, force=False):
+        '''tags used by items in the library
+
+        |coro|
+
+        Parameters
+        ----------
+          same as `get_genres`
+
+        Returns
+        -------
+        list
+          of strings
+        '''
+        items = await self._get_facet('/Tags', types, parent_id, force)
+        return [i.name for i in items]
+
+    @async_func
+    async def item_counts(self, force=False):
+        '''number of items of each type in the library
+
+        |coro|
+
+        Returns
+        -------
+        dict
+          as returned by the server, e.g.
+          `{'MovieCount': 10, 'SeriesCount': 2, 'EpisodeCount': 30, ...}`
+
+        See Also
+        --------
+          query : `emby.query('Movie').genres('Drama').count()` for
+            counts of filtered items
+        '''
+        key = ('/Items/Counts',)
+        if force or key not in self._facet_cache:
+            self._facet_cache[key] = await self.connector.getJson(
+                '/Items/Counts', remote=False, pass_uid=True,
+            )
+        return self._facet_cache[key]
+
+    @async_func
+    async def load_music(self):
+        '''fetch every artist, album and song and link them in memory
+
+        |coro|
+
+        Three listings are crawled (artists, albums and songs), then
+        `MusicArtist.albums`, `MusicArtist.songs` and `MusicAlbum.songs`
+        are filled from the `ArtistItems`/`AlbumArtists`/`AlbumId`
+        fields, so walking the music library needs no further requests.
+        Nothing is cached if a `Deadline` cuts one of the listings short.
+
+        Returns
+        -------
+        list
+          of type :class:`embypy.objects.MusicArtist`
+        '''
+        # nothing is cached until all three listings are in, a listing
+        # cut short by a deadline would leave artists/albums without
+        # some of their songs
+        artists, albums, songs = await asyncio.gather(
+            self._get_artists(), self._get_albums(), self._get_songs()
+        )
+        if deadline.expired():
+            return artists
+        artist_albums = {artist.id: [] for artist in artists}
+        artist_songs = {artist.id: [] for artist in artists}
+        album_songs = {album.id: [] for album in albums}
+
+        def artist_ids(item):
+            return dict.fromkeys(item.album_artist_ids + item.artist_ids)
+
+        for album in albums:
+            for artist_id in artist_ids(album):
+                if artist_id in artist_albums:
+                    artist_albums[artist_id].append(album)
+
+        for song in songs:
+            if song.album_id in album_songs:
+                album_songs[song.album_id].append(song)
+            for artist_id in artist_ids(song):
+                if artist_id in artist_songs:
+                    artist_songs[artist_id].append(song)
+
+        def track_order(song):
+            return (
+                song.object_dict.get('ParentIndexNumber') or 0,
+                song.index_number or 0,
+            )
+
+        for album in albums:
+            album.extras['songs'] = sorted(
+                album_songs[album.id], key=track_order
+            )
+        for artist in artists:
+            artist.extras['albums'] = artist_albums[artist.id]
+            artist.extras['songs'] = artist_songs[artist.id]
+        self.extras['artists'] = artists
+        self.extras['albums'] = albums
+        self.extras['songs'] = songs
+        return artists
+
+    def dirty_objects(self):
+        '''objects changed through setters but not sent yet
+
+        Returns
+        -------
+        list
+          of :class:`embypy.objects.EmbyObject`,
+          see `EmbyObject.changes` for what changed
+        '''
+        return self.known_objects.dirty()
+
+    @async_func
+    async def send_many(
+        self, items=None, concurrency=8, chunk_size=100, rate=None,
+        progress=None,
+    ):
+        '''send changes of many objects to emby
+
+        |coro|
+
+        Same as calling `send` on every object, but concurrently.
+        Unchanged objects are skipped (status 304), every object is
+        posted at most once.
+
+        Parameters
+        ----------
+        items : array_like, optional
+          list of :class:`embypy.objects.EmbyObject` that were modified,
+          default - every object in `dirty_objects`
+        concurrency : int, optional
+          max number of updates in flight (default 8)
+        chunk_size : int, optional
+          objects per chunk, `progress` is called after each chunk
+        rate : float, optional
+          max number of updates started per second (default - no limit)
+        progress : callable, optional
+          `progress(done, total)`
+
+        Returns
+        -------
+        list
+          of :class:`embypy.utils.bulk.BulkResult` (`value` is the
+          `(status, text)` returned by `send`), in the order of `items`
+
+        Examples
+        --------
+        >>> for movie in movies:
+        ...     movie.tags = movie.tags + ['4k']
+        >>> results = await emby.send_many(movies)
+        >>> failed = [r.item for r in results if not r.ok]
+        '''
+        items = list(self.dirty_objects() if items is None else items)
+        done = {}
+
+        # find out which encoding the server takes (unless known from
+        # the capabilities) with one object, before fanning out
+        await self.connector.capabilities
+        if self.connector.send_raw is None:
+            probe = next((item for item in items if item._changed()), None)
+            if probe is not None:
+                result, = await run_bulk(
+                    self._send, [probe], check=self._sent
+                )
+                done[probe.id] = result
+
+        # objects are only sent once, even when listed several times
+        rest = [item for item in items if item.id not in done]
+
+        def report(count, _):
+            if progress:
+                progress(len(done) + count, len(done) + len(rest))
+
+        results = await run_bulk(
+            self._send, rest, concurrency, chunk_size, rate,
+            progress=report, check=self._sent, key=self._item_key,
+        )
+        done.update((result.item.id, result) for result in results)
+        return [done[item.id]._replace(item=item) for item in items]
+
+    @staticmethod
+    async def _send(item):
+        return await item.send()
+
+    @staticmethod
+    def _sent(result):
+        return result[0] < 400
+
+    def _as_object(self, item):
+        # ids do not need a request, the endpoints only use the id
+        if type(item) != str:
+            return item
+        return self.known_objects.get(item) or \
+            objects.EmbyObject({'Id': item}, self.connector, save=False)
+
+    @staticmethod
+    def _item_key(item):
+        return item if type(item) == str else item.id
+
+    def _known(self, obj, user_id, field, value):
+        # whether the item is known (from its loaded user data) to
+        # already have `field` set to `value`
+        data = self.known_objects.get_user_data(
+            user_id or self.connector.userid, obj.id, None
+        )
+        return data is not None and getattr(data, field) == bool(value)
+
+    async def _mutate(self, items, func, skip=None, done=(), **kargs):
+        # generic bulk executor for per item endpoints, returning http
+        # statuses - 304 means the item already was in the wanted state
+        async def apply(item):
+            obj = self._as_object(item)
+            if skip is not None and skip(obj):
+                return 304
+            return await func(obj)
+
+        kargs.setdefault('retries', 2)
+        return await run_bulk(
+            apply, items,
+            check=lambda status: status < 400 or status in done,
+            retry=lambda status: status == 429 or status >= 500,
+            key=self._item_key,
+            **kargs
+        )
+
+    @async_func
+    async def mark_watched(self, items, value=True, user_id=None, **kargs):
+        '''mark many items as (un)played
+
+        |coro|
+
+        Items already in the wanted state (as far as known locally) are
+        skipped, duplicates are only sent once and failed requests
+        (server errors, timeouts) are retried.
+
+        Parameters
+        ----------
+        items : array_like
+          objects or ids
+        value : bool, optional
+          played (default) or unplayed
+        user_id : str, optional
+          for whom, default - the connector's user
+        kargs :
+          `concurrency`, `chunk_size`, `rate`, `retries` (default 2)
+          and `progress`, see `embypy.utils.bulk.run_bulk`
+
+        Returns
+        -------
+        list
+          of :class:`embypy.utils.bulk.BulkResult` (`value` is the http
+          status, 304 if the item was skipped), in the order of `items`
+        '''
+        return await self._mutate(
+            items,
+            lambda obj: obj.setWatched(value, user_id),
+            skip=lambda obj: self._known(obj, user_id, 'played', value),
+            **kargs
+        )
+
+    @async_func
+    async def mark_favorite(self, items, value=True, user_id=None, **kargs):
+        '''(un)mark many items as favorites
+
+        |coro|
+
+        See Also
+        --------
+          mark_watched : same parameters/results
+        '''
+        return await self._mutate(
+            items,
+            lambda obj: obj.setFavorite(value, user_id),
+            skip=lambda obj: self._known(obj, user_id, 'favorite', value),
+            **kargs
+        )
+
+    @async_func
+    async def delete_items(self, items, **kargs):
+        '''delete many items from the server (and the cache)
+
+        |coro|
+
+        Items that are already gone (404) count as deleted.
+
+        See Also
+        --------
+          mark_watched : same parameters/results
+        '''
+        async def delete(obj):
+            status = await self.connector.delete(
+                '/Items/{}'.format(obj.id), remote=False
+            )
+            if status < 400 or status == 404:
+                self.known_objects.pop(obj.id)
+            return status
+
+        return await self._mutate(items, delete, done=(404,), **kargs)
+
+    @async_func
+    async def add_to_collection(self, collection, items, **kargs):
+        '''add many items to a collection (box set)
+
+        |coro|
+
+        Parameters
+        ----------
+        collection : embypy.objects.BoxSet
+          the collection, or its id
+        items : array_like
+          objects or ids
+
+        Notes
+        -----
+        items already known to be in the collection are skipped
+
+        See Also
+        --------
+          mark_watched : other parameters/results
+        '''
+        collection = self._as_object(collection)
+        current = {
+            item.id for item in collection.extras.get('items') or ()
+        }
+        path = '/Collections/{}/Items'.format(collection.id)
+
+        async def add(obj):
+            status, _ = await self.connector.post(
+                path, remote=False, Ids=obj.id
+            )
+            return status
+
+        results = await self._mutate(
+            items, add, skip=lambda obj: obj.id in current, **kargs
+        )
+        if any(result.value != 304 for result in results):
+            collection.extras = None
+        return results
+
+    @async_func
+    async def refresh_user_data(
+        self, user_ids, types='', parent_id=None, concurrency=None
+    ):
+        '''fetch the play state of every item for several users
+
+        |coro|
+
+        Items are listed once per user (concurrently), the metadata is
+        shared and each user's `UserData` is kept in a per user overlay,
+        read with `EmbyObject.user_data(user_id)`.
+
+        Parameters
+        ----------
+        user_ids : array_like
+          emby ids of the users
+        types : str, optional
+          only list items of these (comma separated) types,
+          e.g. `'Movie,Episode'`
+        parent_id : str, optional
+          only list items under this folder/library
+        concurrency : int, optional
+          number of users fetched at once (default `crawl_concurrency`)
+
+        Returns
+        -------
+        dict
+          user id -> list of :class:`embypy.objects.EmbyObject`
+        '''
+        params = {'ParentId': parent_id} if parent_id else {}
+        listing = asyncio.Semaphore(concurrency or self.crawl_concurrency)
+
+        async def fetch(user_id):
+            async with listing:
+                return await self._get_list(types, userId=user_id, **params)
+
+        user_ids = list(user_ids)
+        results = await asyncio.gather(*map(fetch, user_ids))
+        return dict(zip(user_ids, results))
+
+    @async_func
+    async def table(self, items='episodes', user_id=None):
+        '''export a listing as a column oriented table
+
+        |coro|
+
+        Parameters
+        ----------
+        items : str, list
+          name of a listing property (`'movies'`, `'episodes'`,
+          `'songs'`, ...) or a list of objects
+        user_id : str, optional
+          whose play state to use for the UserData columns
+          (default - the connector's user)
+
+        Returns
+        -------
+        embypy.utils.table.LibraryTable
+          numeric fields/dates as numpy arrays,
+          string fields like Type/SeriesName dictionary encoded
+
+        Notes
+        -----
+        requires numpy, pyarrow is needed for arrow/parquet output
+        '''
+        if isinstance(items, str):
+            items = await getattr(self, items)
+        return LibraryTable.from_objects(items, user_id)
+
+    @staticmethod
+    def _list_fields(extra_fields=''):
+        fields = 'Path,ParentId,Overview,PremiereDate,DateCreated'
+        if extra_fields:
+            fields = f'{fields},{extra_fields}'
+        return fields
+
+    async def _get_page(
+        self,
+        types,
+        path='/Users/{UserId}/Items',
+        fields='',
+        start=0,
+        limit=200,
+        sort='SortName',
+        count=True,
+        **params
+    ):
+        # the total is only needed once per listing, counting every
+        # match is the most expensive part of a deep page
+        if not count and (await self.connector.capabilities).supports(
+            'optional_total_count'
+        ):
+            params.setdefault('enableTotalRecordCount', 'false')
+        return await self.connector.getJson(
+            path,
+            remote		= False,
+            format		= 'json',
+            recursive		= 'true',
+            includeItemTypes	= types,
+            fields		= fields or self._list_fields(),
+            sortBy		= sort,
+            sortOrder		= 'Ascending',
+            startIndex		= start,
+            limit		= limit,
+            **params
+        )
+
+    async def _iter_list(
+        self,
+        types,
+        path='/Users/{UserId}/Items',
+        extra_fields='',
+        limit=200,
+        start=0,
+        stop=None,
+        **params
+    ):
+        # same as _get_list, but yields processed pages as they arrive
+        # (and is not shared with other callers)
+        fields = self._list_fields(extra_fields)
+        total = -1
+        while (total == -1 or start < total) and \
+              (stop is None or start < stop):
+            size = limit if stop is None else min(limit, stop - start)
+            try:
+                resp = await self._get_page(
+                    types, path, fields, start, size,
+                    count=total == -1, **params
+                )
+            except deadline.DeadlineExceeded:
+                if not deadline.accept_partial():
+                    raise
+                return
+            if total == -1:
+                total = int(resp.get('TotalRecordCount', -1))
+            if not resp['Items']:
+                break
+            start += len(resp['Items'])
+            yield await self.process(resp['Items'], params.get('userId'))
+
+    async def _count(self, types, path='/Users/{UserId}/Items', **params):
+        resp = await self._get_page(
+            types, path, fields='Path', start=0, limit=0,
+            enableTotalRecordCount='true', **params
+        )
+        return int(resp.get('TotalRecordCount', 0))
+
+    async def _get_slice(self, types, path, fields, limit, **params):
+        # every slice is small, so offsets stay shallow
+        items = []
+        total = -1
+        while total == -1 or len(items) < total:
+            try:
+                resp = await self._get_page(
+                    types, path, fields, len(items), limit,
+                    count=total == -1, **params
+                )
+            except deadline.DeadlineExceeded:
+                if not deadline.accept_partial():
+                    raise
+                break
+            if total == -1:
+                total = int(resp.get('TotalRecordCount', -1))
+            if not resp['Items']:
+                break
+            items.extend(resp['Items'])
+        return items
+
+    async def _partitions(self, types, strategy, **params):
+        if strategy == 'parent':
+            if 'ParentId' in params:
+                return [{}]
+            views = await self.connector.getJson(
+                '/Users/{UserId}/Views', remote=False,
+                userId=params.get('userId'),
+            )
+            return [{'ParentId': view['Id']} for view in views['Items']]
+        if strategy == 'prefix':
+            bounds = [None, *'abcdefghijklmnopqrstuvwxyz', None]
+            return [
+                {
+                    key: value for key, value in (
+                        ('NameStartsWithOrGreater', start),
+                        ('NameLessThan', end),
+                    ) if value
+                }
+                for start, end in zip(bounds, bounds[1:])
+            ]
+        if strategy == 'year':
+            years = await self.get_years(
+                types, params.get('ParentId'), force=True
+            )
+            return [{'Years': year} for year in years]
+        raise ValueError('unknown partition strategy', strategy)
+
+    async def _get_partitioned(
+        self, types, path, extra_fields, limit, partition, **params
+    ):
+        # fetch independent slices concurrently, then merge by id.
+        # if the slices do not add up to the full listing (e.g. items
+        # without a year or outside every library), fall back to a
+        # plain crawl.
+        fields = self._list_fields(
+            f'{extra_fields},SortName' if extra_fields else 'SortName'
+        )
+        limit_slices = asyncio.Semaphore(self.crawl_concurrency)
+
+        async def fetch(slice_params):
+            async with limit_slices:
+                return await self._get_slice(
+                    types, path, fields, limit, **{**params, **slice_params}
+                )
+
+        async def count():
+            try:
+                return await self._count(types, path, **params)
+            except deadline.DeadlineExceeded:
+                if not deadline.accept_partial():
+                    raise
+                return 0
+
+        slices = await self._partitions(types, partition, **params)
+        total, *pages = await asyncio.gather(count(), *map(fetch, slices))
+
+        merged = {}
+        for page in pages:
+            for item in page:
+                merged.setdefault(item.get('Id'), item)
+        truncated = deadline.expired()
+        if len(merged) < total and not truncated:
+            return await self._get_list(
+                types, path, extra_fields, limit, partition=False, **params
+            )
+
+        items = sorted(
+            merged.values(),
+            key=lambda x: (x.get('SortName') or x.get('Name') or '').lower(),
+        )
+        result = await self.process(items, params.get('userId'))
+        if not params and path == '/Users/{UserId}/Items' and not truncated:
+            self.known_objects.mark_complete(types)
+        return result
 
     async def _get_list(
         self,
@@ -234,12 +1109,16 @@ class Emby(objects.EmbyObject):
         # bigger requests = more chances of failure
         # 200 items/request seems to be a nice sweetspot where I'm
         # not getting failures
+        partition = params.pop('partition', self.partition)
+        if partition and path == '/Users/{UserId}/Items':
+            return await self._get_partitioned(
+                types, path, extra_fields, limit, partition, **params
+            )
+
         total = -1
         last = -1
-        fields = 'Path,ParentId,Overview,PremiereDate,DateCreated'
-        if extra_fields:
-            fields = f'{fields},{extra_fields}'
-        hash = (types, path, extra_fields)
+        fields = self._list_fields(extra_fields)
+        hash = (types, path, extra_fields, tuple(sorted(params.items())))
         async with self._cache_lock:
             count, event, items = self._partial_cache.get(hash, (0, None, []))
 
@@ -256,35 +1135,36 @@ class Emby(objects.EmbyObject):
                         event.clear()
                         waiting = False
 
+        truncated = False
         while len(items) != last and (len(items) < total or total == -1):
             try:
-                resp = await self.connector.getJson(
-                    path,
-                    remote		= False,
-                    format		= 'json',
-                    recursive		= 'true',
-                    includeItemTypes	= types,
-                    fields		= fields,
-                    sortBy		= 'SortName',
-                    sortOrder		= 'Ascending',
-                    startIndex		= len(items),
-                    limit		= limit,
-                    **params
+                resp = await self._get_page(
+                    types, path, fields, len(items), limit,
+                    count=total == -1, **params
                 )
-                total = int(resp.get('TotalRecordCount', -1))
+                if total == -1:
+                    total = int(resp.get('TotalRecordCount', -1))
                 last = len(items)
                 items.extend(resp['Items'])
                 async with self._cache_lock:
                     count, event, _ = self._partial_cache[hash]
                     self._partial_cache[hash] = (count, event, items)
-            except Exception:
+            except Exception as e:
+                if isinstance(e, deadline.DeadlineExceeded) and \
+                   deadline.accept_partial():
+                    truncated = True
+                    break
                 async with self._cache_lock:
                     self._partial_cache[hash] = (count - 1, event, items)
                 event.set()
                 raise
         # do all the item fetching after we get the full list of item ids
         try:
-            return await self.process(items)
+            result = await self.process(items, params.get('userId'))
+            if not params and path == '/Users/{UserId}/Items' and \
+               not truncated:
+                self.known_objects.mark_complete(types)
+            return result
         finally:
             async with self._cache_lock:
                 count, event, _ = self._partial_cache[hash]
@@ -313,12 +1193,15 @@ class Emby(objects.EmbyObject):
     @property
     @async_func
     async def albums_force(self):
-        items = await self._get_list(
+        items = await self._get_albums()
+        self._keep('albums', items)
+        return items
+
+    async def _get_albums(self):
+        return await self._get_list(
             'MusicAlbum',
             extra_fields='Genres,Tags,Artists',
         )
-        self.extras['albums'] = items
-        return items
 
     @property
     @async_func
@@ -339,13 +1222,16 @@ class Emby(objects.EmbyObject):
     @property
     @async_func
     async def songs_force(self):
-        items = await self._get_list(
+        items = await self._get_songs()
+        self._keep('songs', items)
+        return items
+
+    async def _get_songs(self):
+        return await self._get_list(
             'Audio',
             extra_fields='Genres,Tags,Artists',
             limit=300,
         )
-        self.extras['songs'] = items
-        return items
 
     @property
     @async_func
@@ -367,7 +1253,7 @@ class Emby(objects.EmbyObject):
     @async_func
     async def playlists_force(self):
         items = await self._get_list('Playlist')
-        self.extras['playlists'] = items
+        self._keep('playlists', items)
         return items
 
     @property
@@ -389,12 +1275,15 @@ class Emby(objects.EmbyObject):
     @property
     @async_func
     async def artists_force(self):
-        items = await self._get_list(
+        items = await self._get_artists()
+        self._keep('artists', items)
+        return items
+
+    async def _get_artists(self):
+        return await self._get_list(
             'MusicArtist',
             extra_fields='Genres,Tags',
         )
-        self.extras['artists'] = items
-        return items
 
     @property
     @async_func
@@ -420,7 +1309,7 @@ class Emby(objects.EmbyObject):
             extra_fields='Genres,Tags,ProviderIds',
             limit=100,
         )
-        self.extras['movies'] = items
+        self._keep('movies', items)
         return items
 
     @property
@@ -443,7 +1332,7 @@ class Emby(objects.EmbyObject):
     @async_func
     async def series_force(self):
         items = await self._get_list('Series', extra_fields='Genres,Tags')
-        self.extras['series'] = items
+        self._keep('series', items)
         return items
 
     @property
@@ -470,7 +1359,7 @@ class Emby(objects.EmbyObject):
             extra_fields='Genres,Tags',
             limit=500,
         )
-        self.extras['episodes'] = items
+        self._keep('episodes', items)
         return items
 
     @property
@@ -1,5 +1,18 @@
-from embypy.objects.object import EmbyObject
+import asyncio
+
+from embypy.objects.object import EmbyObject, ItemDiff, diff_items, _item_id
 from embypy.utils.asyncio import async_func
+from embypy.utils import deadline
+from embypy.utils.bulk import run_bulk
+from embypy.utils.ingest import expand_id
+
+
+# max number of ids sent in one playlist request
+PLAYLIST_CHUNK_SIZE = 200
+
+
+def _chunks(values, size):
+    return [values[i:i + size] for i in range(0, len(values), size)]
 
 
 # Generic class
@@ -13,6 +26,8 @@ class Folder(EmbyObject):
       connector : embypy.utils.connector.Connector
         same as for `EmbyObject`
     '''
+    __slots__ = ()
+
     def __init__(self, object_dict, connector):
         super().__init__(object_dict, connector)
 
@@ -50,14 +65,165 @@ class Folder(EmbyObject):
     @property
     @async_func
     async def items_force(self):
-        items = await self.connector.getJson(
+        items = []
+        async for page in self._iter_children():
+            items.extend(page)
+        self._keep('items', items)
+        return items
+
+    async def _get_children(self, start, limit):
+        return await self.connector.getJson(
             '/Users/{UserId}/Items', parentId=self.id, remote=False,
             SortOrder='Ascending', SortBy='SortName',
+            StartIndex=start, Limit=limit,
         )
-        items = await self.process(items)
-        self.extras['items'] = items
+
+    async def _iter_children(self, limit=200):
+        async for page in self._iter_pages(self._get_children, limit):
+            yield page
+
+    async def _walk_children(self, limit):
+        # what `walk` descends into, the folder's children by default
+        async for page in self._iter_children(limit):
+            yield page
+
+    async def _iter_pages(self, get, limit):
+        start = 0
+        while True:
+            try:
+                resp = await get(start, limit)
+            except deadline.DeadlineExceeded:
+                if not deadline.accept_partial():
+                    raise
+                return
+            items = resp.get('Items') or []
+            if items:
+                page = await self.process(items)
+                yield [item for item in page if item is not None]
+            start += len(items)
+            total = resp.get('TotalRecordCount', start)
+            if not items or start >= total:
+                break
+
+    @async_func
+    async def walk(
+        self, types=None, folders=None, max_depth=None,
+        concurrency=4, limit=200,
+    ):
+        '''iterate over everything below the folder
+
+        |coro|
+
+        Subfolders are listed concurrently and items are yielded as soon
+        as their page arrives, so the order is not deterministic.
+        Every folder is listed at most once, even if it is reachable
+        through several paths (or contains itself).
+
+        Parameters
+        ----------
+        types : str, iterable, optional
+          only yield items of these types (e.g. `'Audio'` or
+          `['Movie', 'Series']`), default - everything
+        folders : str, iterable, optional
+          only descend into folders of these types (e.g. `'BoxSet'`),
+          default - all folders (artists are descended into through
+          their songs)
+        max_depth : int, optional
+          how deep to descend, 1 = only direct children,
+          default - no limit
+        concurrency : int, optional
+          max number of folders listed at the same time (default 4)
+        limit : int, optional
+          number of items requested per page (default 200)
+
+        Yields
+        ------
+        :class:`embypy.objects.EmbyObject`
+        '''
+        if isinstance(types, str):
+            types = types.split(',')
+        if isinstance(folders, str):
+            folders = folders.split(',')
+        types = set(types) if types is not None else None
+        folders = set(folders) if folders is not None else None
+
+        visited = {self.id}
+        found = asyncio.Queue()
+        listing = asyncio.Semaphore(concurrency)
+        tasks = set()
+
+        async def visit(folder, depth):
+            try:
+                async with listing:
+                    async for page in folder._walk_children(limit):
+                        await found.put((depth, page))
+            except Exception as e:
+                await found.put((depth, e))
+            finally:
+                await found.put(None)
+
+        def schedule(folder, depth):
+            tasks.add(asyncio.ensure_future(visit(folder, depth)))
+
+        schedule(self, 1)
+        running = 1
+        try:
+            while running:
+                result = await found.get()
+                if result is None:
+                    running -= 1
+                    continue
+                depth, page = result
+                if isinstance(page, Exception):
+                    raise page
+                for item in page:
+                    if isinstance(item, Folder):
+                        if item.id in visited:
+                            continue
+                        visited.add(item.id)
+                        if (max_depth is None or depth < max_depth) and \
+                           (folders is None or item.type in folders):
+                            schedule(item, depth + 1)
+                            running += 1
+                    if types is None or item.type in types:
+                        yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _collect(self, key, types, folders):
+        items = [item async for item in self.walk(types, folders)]
+        items.sort(
+            key=lambda x: x.object_dict.get('SortName') or x.name or ''
+        )
+        self._keep(key, items)
         return items
 
+    @async_func
+    async def diff(self, items):
+        '''compare the contents of the folder with a list of objects
+
+        |coro|
+
+        Parameters
+        ----------
+        items : array_like
+          objects (or ids) the folder should contain
+
+        Returns
+        -------
+        embypy.objects.ItemDiff
+          `added` - in `items` but not the folder,
+          `removed` - in the folder but not `items`,
+          `common` - in both
+
+        See Also
+        --------
+          embypy.objects.diff_items :
+        '''
+        return diff_items(await self.items, items)
+
 
 # Folders
 class Playlist(Folder):
@@ -70,6 +236,8 @@ class Playlist(Folder):
       connector : embypy.utils.connector.Connector
         same as for `EmbyObject`
     '''
+    __slots__ = ()
+
     def __init__(self, object_dict, connector):
         super().__init__(object_dict, connector)
 
@@ -87,42 +255,110 @@ class Playlist(Folder):
         list
           of type :class:`embypy.objects.Audio`
         '''
-        items = []
-        for i in await self.items:
-            if type(i) == str:
-                items.append(await self.process(i))
-            elif i.type == 'Audio':
-                items.append(i)
-            elif hasattr(i, 'songs'):
-                items.extend(await i.songs)
-        return items
+        return self.extras.get('songs') or await self.songs_force
 
     @property
     @async_func
     async def songs_force(self):
-        items = []
-        for i in await self.items_force:
-            if type(i) == str:
-                items.append(await self.process(i))
-            elif i.type == 'Audio':
-                items.append(i)
-            elif hasattr(i, 'songs'):
-                items.extend(await i.songs)
-        return items
+        return await self._collect(
+            'songs', 'Audio', 'Playlist,MusicAlbum,MusicArtist'
+        )
+
+    async def _get_children(self, start, limit):
+        return await self.connector.getJson(
+            'Playlists/{Id}/Items'.format(Id=self.id),
+            remote=False, SortOrder='Ascending', SortBy='SortName',
+            StartIndex=start, Limit=limit,
+        )
 
     @property
     @async_func
-    async def items_force(self):
-        items = await self.connector.getJson(
+    async def entries(self):
+        '''the playlist's entries, as listed by the server
+
+        |coro|
+
+        Returns
+        -------
+        list
+          of `(entry id, item)` tuples - the entry id identifies the
+          position in the playlist (an item can be added several times)
+        '''
+        # the first page tells the total, the rest is fetched at once
+        size = PLAYLIST_CHUNK_SIZE
+        first = await self._get_children(0, size)
+        total = first.get('TotalRecordCount', 0)
+        pages = [first] + list(await asyncio.gather(*(
+            self._get_children(start, size)
+            for start in range(size, total, size)
+        )))
+
+        entries = []
+        for resp in pages:
+            page = resp.get('Items') or []
+            # entry ids are read before the (shared) objects are merged
+            ids = [i.get('PlaylistItemId') or i.get('Id') for i in page]
+            entries.extend(zip(ids, await self.process(page)))
+        self.extras['items'] = [item for _, item in entries]
+        return entries
+
+    async def _post_ids(self, ids):
+        status, _ = await self.connector.post(
             'Playlists/{Id}/Items'.format(Id=self.id),
-            remote=False, SortOrder='Ascending', SortBy='SortName',
+            data={'Ids': ','.join(ids)}, remote=False
         )
-        items = await self.process(items)
-        self.extras['items'] = items
-        return items
+        return status
+
+    async def _delete_entries(self, entry_ids):
+        return await self.connector.delete(
+            'Playlists/{Id}/Items'.format(Id=self.id),
+            EntryIds=','.join(entry_ids),
+            remote=False
+        )
+
+    async def _apply(self, add, remove, concurrency, chunk_size):
+        # removals are independent, appends are sent in order so the
+        # new items keep the order they were given in.
+        # returns the ids that were added, the entries that were removed
+        # and (action, chunk, status or exception) of failed chunks
+        chunk_size = chunk_size or PLAYLIST_CHUNK_SIZE
+        added, removed, failed = [], set(), []
+        try:
+            results = await run_bulk(
+                self._delete_entries, _chunks(remove, chunk_size),
+                concurrency, check=lambda status: status < 400,
+            )
+            for result in results:
+                if result.ok:
+                    removed.update(result.item)
+                else:
+                    failed.append(
+                        ('remove', result.item, result.error or result.value)
+                    )
+            for chunk in _chunks(add, chunk_size):
+                try:
+                    status = await self._post_ids(chunk)
+                except Exception as e:
+                    status = e
+                if not isinstance(status, int) or status >= 400:
+                    # later chunks would end up before this one
+                    failed.append(('add', chunk, status))
+                    break
+                added.extend(chunk)
+        finally:
+            self.extras = None
+        return added, removed, failed
+
+    @staticmethod
+    def _check(diff, failed):
+        if failed:
+            raise RuntimeError(
+                'playlist was only partly updated', diff, failed
+            )
+        return diff
 
     @async_func
-    async def add_items(self, *items):
+    async def add_items(self, *items, chunk_size=None):
         '''append items to the playlist
 
         |coro|
@@ -131,23 +367,29 @@ class Playlist(Folder):
         ----------
         items : array_like
           list of items to add(or their ids)
+        chunk_size : int, optional
+          max number of ids per request
+
+        Raises
+        ------
+        RuntimeError
+          if a chunk was rejected - `args` are the message, the
+          :class:`embypy.objects.ItemDiff` of what was applied and a
+          list of `(action, ids, status or exception)` that failed
 
         See Also
         --------
           remove_items :
+          sync :
         '''
-        items = [item.id for item in await self.process(items)]
-        if not items:
-            return
-
-        await self.connector.post(
-            'Playlists/{Id}/Items'.format(Id=self.id),
-            data={'Ids': ','.join(items)}, remote=False
+        added, _, failed = await self._apply(
+            [_item_id(i) for i in items], [], 1, chunk_size
         )
+        self._check(ItemDiff(added, [], []), failed)
 
     @async_func
-    async def remove_items(self, *items):
-        '''remove items from the playlist
+    async def remove_items(self, *items, concurrency=4, chunk_size=None):
+        '''remove items (every entry of them) from the playlist
 
         |coro|
 
@@ -155,24 +397,95 @@ class Playlist(Folder):
         ----------
         items : array_like
           list of items to remove(or their ids)
+        concurrency : int, optional
+          number of requests sent at once
+        chunk_size : int, optional
+          max number of entries per request
+
+        Raises
+        ------
+        RuntimeError
+          if a chunk was rejected (see `add_items`)
 
         See Also
         --------
           add_items :
+          sync :
         '''
-        items = [
-            i.id
-            for i in (await self.process(items))
-            if i in self.items
+        ids = {_item_id(i) for i in items}
+        entries = [
+            (entry, item) for entry, item in await self.entries
+            if item.id in ids
         ]
-        if not items:
-            return
+        _, removed, failed = await self._apply(
+            [], [entry for entry, _ in entries], concurrency, chunk_size
+        )
+        self._check(
+            ItemDiff([], [item for e, item in entries if e in removed], []),
+            failed,
+        )
 
-        await self.connector.delete(
-            'Playlists/{Id}/Items'.format(Id=self.id),
-            EntryIds=','.join(items),
-            remote=False
+    @async_func
+    async def sync(self, items, concurrency=4, chunk_size=None):
+        '''make the playlist contain exactly the given items
+
+        |coro|
+
+        Only the difference is sent - entries that are not wanted
+        anymore are removed (by entry id), missing items are appended.
+        Items that appear several times are kept as many times.
+
+        Parameters
+        ----------
+        items : array_like
+          the wanted items (or their ids)
+        concurrency : int, optional
+          number of removal requests sent at once
+        chunk_size : int, optional
+          max number of ids per request
+
+        Returns
+        -------
+        embypy.objects.ItemDiff
+          `added` - ids appended, `removed` - removed items,
+          `common` - items that were kept
+
+        Raises
+        ------
+        RuntimeError
+          if a chunk was rejected (see `add_items`), the diff in its
+          `args` only holds what the server accepted
+
+        Notes
+        -----
+        Entries that are kept are not reordered, new items are
+        appended at the end.
+        '''
+        items = [_item_id(i) for i in items]
+        wanted = {}
+        for item_id in items:
+            wanted[item_id] = wanted.get(item_id, 0) + 1
+
+        remove, removed, common = [], [], []
+        for entry, item in await self.entries:
+            if wanted.get(item.id):
+                wanted[item.id] -= 1
+                common.append(item)
+            else:
+                remove.append(entry)
+                removed.append(item)
+
+        add = []
+        for item_id in items:
+            if wanted.get(item_id):
+                wanted[item_id] -= 1
+                add.append(item_id)
+
+        added, done, failed = await self._apply(
+            add, remove, concurrency, chunk_size
         )
+        removed = [item for e, item in zip(remove, removed) if e in done]
+        return self._check(ItemDiff(added, removed, common), failed)
 
 
 class BoxSet(Folder):
@@ -185,6 +498,8 @@ class BoxSet(Folder):
       connector : embypy.utils.connector.Connector
         same as for `EmbyObject`
     '''
+    __slots__ = ()
+
     def __init__(self, object_dict, connector):
         super().__init__(object_dict, connector)
 
@@ -202,28 +517,12 @@ class BoxSet(Folder):
         list
           of type :class:`embypy.objects.Movie`
         '''
-        items = []
-        for i in await self.items:
-            if type(i) == str:
-                items.append(await self.process(i))
-            elif i.type == 'Movie':
-                items.append(i)
-            elif hasattr(i, 'movies'):
-                items.extend(await i.movies)
-        return items
+        return self.extras.get('movies') or await self.movies_force
 
     @property
     @async_func
     async def movies_force(self):
-        items = []
-        for i in await self.items_force:
-            if type(i) == str:
-                items.append(await self.process(i))
-            elif i.type == 'Movie':
-                items.append(i)
-            elif hasattr(i, 'movies'):
-                items.extend(await i.movies)
-        return items
+        return await self._collect('movies', 'Movie', 'BoxSet')
 
     @property
     @async_func
@@ -244,15 +543,7 @@ class BoxSet(Folder):
         list
           of type :class:`embypy.objects.Series`
         '''
-        items = []
-        for i in await self.items:
-            if type(i) == str:
-                items.append(await self.process(i))
-            elif i.type == 'Series':
-                items.append(i)
-            elif hasattr(i, 'series'):
-                items.extend(await i.series)
-        return items
+        return self.extras.get('series') or await self.series_force
 
     @property
     @async_func
@@ -262,15 +553,7 @@ class BoxSet(Folder):
     @property
     @async_func
     async def series_force(self):
-        items = []
-        for i in await self.items_force:
-            if type(i) == str:
-                items.append(await self.process(i))
-            elif i.type == 'Series':
-                items.append(i)
-            elif hasattr(i, 'series'):
-                items.extend(await i.series)
-        return items
+        return await self._collect('series', 'Series', 'BoxSet')
 
 
 class MusicAlbum(Folder):
@@ -283,6 +566,8 @@ class MusicAlbum(Folder):
       connector : embypy.utils.connector.Connector
         same as for `EmbyObject`
     '''
+    __slots__ = ()
+
     def __init__(self, object_dict, connector):
         super().__init__(object_dict, connector)
 
@@ -361,6 +646,8 @@ class MusicAlbum(Folder):
 
 
 class MusicArtist(Folder):
+    __slots__ = ()
+
     def __init__(self, object_dict, connector):
         super().__init__(object_dict, connector)
 
@@ -368,6 +655,25 @@ class MusicArtist(Folder):
     def premiere_date(self):
         return self.object_dict.get('PremiereDate')
 
+    async def _get_songs(self, start, limit):
+        return await self.connector.getJson(
+            '/Users/{UserId}/Items',
+            remote            = False,
+            SortOrder         = 'Ascending',
+            SortBy            = 'SortName',
+            ArtistIds         = self.id,
+            Recursive         = 'true',
+            IncludeItemTypes  = 'Audio',
+            Fields            = 'Path,ParentId,Overview',
+            StartIndex        = start,
+            Limit             = limit,
+        )
+
+    async def _walk_children(self, limit):
+        # songs are not children of the artist, they are linked by id
+        async for page in self._iter_pages(self._get_songs, limit):
+            yield page
+
     @property
     @async_func
     async def albums(self):
@@ -427,7 +733,7 @@ class MusicArtist(Folder):
             format            = 'json',
             SortOrder         = 'Ascending',
             SortBy            = 'SortName',
-            AlbumIds          = self.id,
+            ArtistIds         = self.id,
             Recursive         = 'true',
             IncludeItemTypes  = 'Audio',
             Fields            = 'Path,ParentId,Overview'
@@ -447,6 +753,8 @@ class Season(Folder):
       connector : embypy.utils.connector.Connector
         same as for `EmbyObject`
     '''
+    __slots__ = ()
+
     def __init__(self, object_dict, connector):
         super().__init__(object_dict, connector)
 
@@ -457,7 +765,7 @@ class Season(Folder):
 
     @index_number.setter
     def index_number(self, value):
-        self.object_dict['IndexNumber'] = value
+        self._set('IndexNumber', value)
 
     @property
     def played_percentage(self):
@@ -467,7 +775,7 @@ class Season(Folder):
     @property
     def series_id(self):
         '''emby id of the show'''
-        return self.object_dict.get('SeriesId')
+        return expand_id(self.object_dict.get('SeriesId'))
 
     @property
     @async_func
@@ -541,6 +849,8 @@ class Series(Folder):
       connector : embypy.utils.connector.Connector
         same as for `EmbyObject`
     '''
+    __slots__ = ()
+
     def __init__(self, object_dict, connector):
         super().__init__(object_dict, connector)
 
@@ -583,6 +893,11 @@ class Series(Folder):
     @property
     @async_func
     async def seasons_force(self):
+        items = await self._get_seasons()
+        self.extras['seasons'] = items
+        return items
+
+    async def _get_seasons(self):
         items = await self.connector.getJson(
             '/Shows/{}/Seasons'.format(self.id),
             remote            = False,
@@ -593,9 +908,7 @@ class Series(Folder):
             pass_uid          = True,
             Fields            = 'Path,ParentId,Overview'
         )
-        items = await self.process(items)
-        self.extras['seasons'] = items
-        return items
+        return await self.process(items)
 
     @property
     @async_func
@@ -616,6 +929,11 @@ class Series(Folder):
     @property
     @async_func
     async def episodes_force(self):
+        items = await self._get_episodes()
+        self.extras['episodes'] = items
+        return items
+
+    async def _get_episodes(self):
         items = await self.connector.getJson(
             '/Shows/{}/Episodes'.format(self.id),
             remote            = False,
@@ -626,9 +944,52 @@ class Series(Folder):
             pass_uid          = True,
             Fields            = 'Path,ParentId,Overview'
         )
-        items = await self.process(items)
-        self.extras['episodes'] = items
-        return items
+        return await self.process(items)
+
+    @async_func
+    async def load_hierarchy(self):
+        '''fetch all seasons and episodes of the show at once
+
+        |coro|
+
+        Seasons and episodes are requested concurrently (two requests
+        in total), episodes are then split up by season locally.
+        Fills `seasons`/`episodes` of the show and `episodes` of every
+        season, so none of them need a request afterwards (only once
+        both listings are complete).
+
+        Returns
+        -------
+        list
+          of type :class:`embypy.objects.Season`, each with its
+          episodes sorted by episode number
+        '''
+        # nothing is cached until both listings are in, so a deadline
+        # can not leave the seasons without their episodes
+        seasons, episodes = await asyncio.gather(
+            self._get_seasons(), self._get_episodes()
+        )
+        episodes = sorted(
+            episodes,
+            key=lambda x: (x.season_number or 0, x.index_number or 0)
+        )
+
+        # by id, season numbers are missing (None) for some seasons
+        by_id = {season.id: [] for season in seasons}
+        for episode in episodes:
+            group = by_id.get(episode.season_id)
+            if group is None:
+                group = by_id.get(episode.parent_id)
+            if group is not None:
+                group.append(episode)
+
+        seasons = sorted(seasons, key=lambda x: x.index_number or 0)
+        for season in seasons:
+            season.extras['episodes'] = by_id[season.id]
+        self.extras['episodes'] = episodes
+        self.extras['seasons'] = seasons
+        return seasons
+
 
 # Game
 class GameSystem(Folder):
@@ -641,5 +1002,7 @@ class GameSystem(Folder):
       connector : embypy.utils.connector.Connector
         same as for `EmbyObject`
     '''
+    __slots__ = ()
+
     def __init__(self, object_dict, connector):
         super().__init__(object_dict, connector)
@@ -1,5 +1,6 @@
 from embypy.objects.object import EmbyObject
 from embypy.utils.asyncio import async_func
+from embypy.utils.ingest import expand_id
 
 
 # Generic class
@@ -13,13 +14,15 @@ class Audio(EmbyObject):
       connector : embypy.utils.connector.Connector
         same as for `EmbyObject`
     '''
+    __slots__ = ()
+
     def __init__(self, object_dict, connector):
         super().__init__(object_dict, connector)
 
     @property
     def album_id(self):
         '''the id of the album this song is in'''
-        return self.object_dict.get('AlbumId')
+        return expand_id(self.object_dict.get('AlbumId'))
 
     @property
     def album_name(self):
@@ -46,7 +49,7 @@ class Audio(EmbyObject):
 
     @index_number.setter
     def index_number(self, value):
-        self.object_dict['IndexNumber'] = value
+        self._set('IndexNumber', value)
 
     @property
     def track_number(self):
@@ -149,6 +152,8 @@ class Person(EmbyObject):
       connector : embypy.utils.connector.Connector
         same as for `EmbyObject`
     '''
+    __slots__ = ()
+
     def __init__(self, object_dict, connector):
         super().__init__(object_dict, connector)
 
@@ -159,7 +164,7 @@ class Person(EmbyObject):
 
     @role.setter
     def role(self, value):
-        self.object_dict['Role'] = value
+        self._set('Role', value)
 
     @property
     def type(self):
@@ -184,6 +189,8 @@ class Image(EmbyObject):
       connector : embypy.utils.connector.Connector
         same as for `EmbyObject`
     '''
+    __slots__ = ()
+
     def __init__(self, object_dict, connector):
         super().__init__(object_dict, connector)
 
@@ -199,6 +206,8 @@ class Game(EmbyObject):
       connector : embypy.utils.connector.Connector
         same as for `EmbyObject`
     '''
+    __slots__ = ()
+
     def __init__(self, object_dict, connector):
         super().__init__(object_dict, connector)
 
@@ -213,6 +222,8 @@ class Photo(EmbyObject):
       connector : embypy.utils.connector.Connector
         same as for `EmbyObject`
     '''
+    __slots__ = ()
+
     def __init__(self, object_dict, connector):
         super().__init__(object_dict, connector)
 
@@ -228,6 +239,8 @@ class Book(EmbyObject):
       connector : embypy.utils.connector.Connector
         same as for `EmbyObject`
     '''
+    __slots__ = ()
+
     def __init__(self, object_dict, connector):
         super().__init__(object_dict, connector)
 
@@ -243,6 +256,8 @@ class Device(EmbyObject):
       connector : embypy.utils.connector.Connector
         same as for `EmbyObject`
     '''
+    __slots__ = ()
+
     def __init__(self, object_dict, connector):
         super().__init__(object_dict, connector)
 
@@ -281,12 +296,14 @@ class User(EmbyObject):
       connector : embypy.utils.connector.Connector
         same as for `EmbyObject`
     '''
+    __slots__ = ()
+
     def __init__(self, object_dict, connector):
         super().__init__(object_dict, connector)
 
     @property
     def id(self):
-        return self.object_dict.get('Id')
+        return expand_id(self.object_dict.get('Id'))
 
     @property
     def name(self):
@@ -1,7 +1,10 @@
+from embypy.utils import deadline
 from embypy.utils.asyncio import async_func
+from embypy.utils.ingest import expand_id, expand_ids
+from embypy.utils.dates import parse_datetime
 
-import arrow
 import datetime
+from collections import namedtuple
 
 _EMPTY_OBJ = {
     "Id": "",
@@ -52,6 +55,75 @@ _EMPTY_OBJ = {
 }
 
 
+# marks fields that did not exist before they were set
+_MISSING = object()
+
+# json keys the setters change, the fingerprint `send` compares covers
+# these (in place edits of other keys are not noticed)
+EDITABLE_FIELDS = (
+    'Name', 'Genres', 'Tags', 'Overview', 'CommunityRating', 'PremiereDate',
+    'DateCreated', 'IndexNumber', 'Role', 'SeasonId',
+)
+
+# endpoint of `EmbyObject._mark` -> field of the user data it changes
+_MARK_FIELDS = {'PlayedItems': 'played', 'FavoriteItems': 'favorite'}
+
+ItemDiff = namedtuple('ItemDiff', ['added', 'removed', 'common'])
+
+
+def _item_id(item):
+    return item if type(item) == str else item.id
+
+
+def diff_items(current, desired):
+    '''compare two lists of objects (or ids) by id in linear time
+
+    Parameters
+    ----------
+    current : array_like
+      objects/ids that exist now (e.g. the items of a playlist)
+    desired : array_like
+      objects/ids that should exist
+
+    Returns
+    -------
+    ItemDiff
+      named tuple of lists - `added` (in desired only),
+      `removed` (in current only) and `common` (in both),
+      each in the order of the list it was taken from
+    '''
+    current_ids = {_item_id(i) for i in current}
+    desired_ids = {_item_id(i) for i in desired}
+    return ItemDiff(
+        added	= [i for i in desired if _item_id(i) not in current_ids],
+        removed	= [i for i in current if _item_id(i) not in desired_ids],
+        common	= [i for i in current if _item_id(i) in desired_ids],
+    )
+
+
+def parse_dates(objects, key='PremiereDate'):
+    '''parsed dates for a list of objects
+
+    Parameters
+    ----------
+    objects : array_like
+      list of :class:`EmbyObject`
+    key : str, optional
+      json key of the date, `'PremiereDate'` (default) or `'DateCreated'`
+
+    Returns
+    -------
+    list
+      of `datetime.datetime` (or None), in the same order as `objects`
+
+    See Also
+    --------
+      EmbyObject.premier_date :
+      EmbyObject.date_created :
+    '''
+    return [obj._get_date(key) for obj in objects]
+
+
 class EmbyObject(object):
     '''Deafult EMby Object Template
 
@@ -65,19 +137,42 @@ class EmbyObject(object):
       if true, append to list of existing objects
       saves space/increases speed/reduces issues
       only set to false if creating a temp object that will be thrown out
+
+    Notes
+    -----
+    Objects use `__slots__` (subclasses should declare `__slots__ = ()`)
+    and only allocate `extras` once something is cached in it, as large
+    libraries can hold hundreds of thousands of these.
+
+    Setters record which fields changed (see `dirty`). Changes made in
+    place to lists returned by a property (e.g. `obj.tags.append(...)`)
+    are still found by `send`, which compares the editable fields
+    against a fingerprint taken when the object was first handed out for
+    editing, but they are not listed in `dirty` and a refetch before
+    sending replaces them. Edit `object_dict` directly only together
+    with `send(force=True)`.
     '''
-    known_objects = {}
+    __slots__ = (
+        'connector', 'object_dict', '_extras', '_dates', '_dirty',
+        '_fingerprint', '__weakref__',
+    )
 
     def __init__(self, object_dict, connector, save=True):
         self.connector = connector
         self.object_dict = object_dict
-        self.extras = {}
+        self._extras = None
+        self._dates = None
+        self._dirty = None
+        self._fingerprint = None
         if save:
-            EmbyObject.known_objects[object_dict.get('Id')] = self
+            connector.known_objects.add(self)
 
     def __eq__(self, other):
         return isinstance(other, EmbyObject) and self.id == other.id
 
+    def __hash__(self):
+        return hash(self.id)
+
     def __setattr__(self, name, value):
         if name.endswith('_sync'):
             return self.__setattr__(name[:-5], value)
@@ -88,12 +183,134 @@ class EmbyObject(object):
             return self.__getattr__(name[:-5])
         return self.__getattribute__(name)
 
+    @property
+    def extras(self):
+        '''dict of cached lists/values fetched for this object'''
+        if self._extras is None:
+            self._extras = {}
+        return self._extras
+
+    @extras.setter
+    def extras(self, value):
+        self._extras = value or None
+
+    def _keep(self, key, items):
+        '''store a fetched list in `extras`, unless a deadline cut it short'''
+        if not deadline.expired():
+            self.extras[key] = items
+
+    def _set(self, key, value):
+        '''set a field of `object_dict`, remembering its original value'''
+        old = self.object_dict.get(key, _MISSING)
+        if old == value:
+            return
+        self._watch()
+        if self._dirty is None:
+            self._dirty = {}
+            self.known_objects.mark_dirty(self)
+        original = self._dirty.setdefault(key, old)
+        self.object_dict[key] = value
+        if key in self.known_objects.indexed_keys:
+            self.known_objects.reindex(self)
+        if original == value:
+            self._clean((key,))
+
+    def _digest(self):
+        # fingerprint of the editable fields, to notice changes that did
+        # not go through a setter
+        get = self.object_dict.get
+        return hash(repr([get(key) for key in EDITABLE_FIELDS]))
+
+    def _watch(self):
+        # taken before the first edit (or before a mutable value is
+        # handed out), objects that were never edited skip the digest
+        if self._fingerprint is None:
+            self._fingerprint = self._digest()
+
+    def _edited(self):
+        return self._fingerprint is not None and \
+            self._fingerprint != self._digest()
+
+    def _changed(self):
+        '''whether there is anything to send'''
+        return self._dirty is not None or self._edited()
+
+    def _merge(self, object_dict):
+        '''apply a fetched dict, keeping pending edits of fields the
+        fetched data did not change
+        '''
+        pending = self._dirty
+        unsent = self._edited()
+        if pending is None:
+            self.object_dict.update(object_dict)
+        else:
+            for key, value in object_dict.items():
+                original = pending.get(key, _MISSING)
+                if original is not _MISSING and original == value:
+                    # same as before the edit - keep the edit
+                    continue
+                self.object_dict[key] = value
+                pending.pop(key, None)
+        if self._fingerprint is not None and not unsent:
+            self._fingerprint = self._digest()
+        if self._dirty is not None and not self._dirty:
+            self._dirty = None
+            self.known_objects.mark_clean(self)
+
+    def _clean(self, keys=None):
+        '''forget changes to `keys` (default all), e.g. after sending'''
+        if keys is None and self._fingerprint is not None:
+            self._fingerprint = self._digest()
+        if self._dirty is None:
+            return
+        if keys is None:
+            self._dirty = None
+        else:
+            for key in keys:
+                self._dirty.pop(key, None)
+            self._dirty = self._dirty or None
+        if self._dirty is None:
+            self.known_objects.mark_clean(self)
+
+    @property
+    def dirty(self):
+        '''set of json keys changed through setters since the last
+        load/send (empty if no setter changed anything)
+        '''
+        return frozenset(self._dirty or ())
+
+    def changes(self):
+        '''changed fields
+
+        Returns
+        -------
+        dict
+          json key -> (old value, new value), old is None for fields
+          that did not exist before
+        '''
+        return {
+            key: (None if old is _MISSING else old, self.object_dict.get(key))
+            for key, old in (self._dirty or {}).items()
+        }
+
+    @property
+    def known_objects(self):
+        '''identity map of objects already created through this connector
+
+        See Also
+        --------
+          embypy.utils.ObjectCache :
+        '''
+        return self.connector.known_objects
+
     @property
     def id(self):
         '''string with hexidecimal hash representing the id of this
         object in emby
         '''
-        return self.object_dict.get('Id') or self.object_dict.get('ItemId')
+        return expand_id(
+            self.object_dict.get('Id') or self.object_dict.get('ItemId')
+        )
 
     @property
     def name(self):
@@ -107,7 +324,7 @@ class EmbyObject(object):
 
     @name.setter
     def name(self, value):
-        self.object_dict['Name'] = value
+        self._set('Name', value)
 
     @property
     def title(self):
@@ -133,10 +350,33 @@ class EmbyObject(object):
         '''
         return self.object_dict.get('Path', '')
 
+    def user_data(self, user_id=None):
+        '''play state of the item for a user
+
+        Parameters
+        ----------
+        user_id : str, optional
+          emby id of the user, default - the connector's user
+
+        Returns
+        -------
+        embypy.utils.userdata.UserData
+          named tuple of `played`, `play_count`, `position_ticks`,
+          `favorite` and `last_played`
+
+        Notes
+        -----
+        Only known for users the item was fetched as
+        (see `embypy.Emby.refresh_user_data`).
+        '''
+        return self.known_objects.get_user_data(
+            user_id or self.connector.userid, self.id
+        )
+
     @property
     def watched(self):
         '''returns True it item has been watched'''
-        return self.object_dict.get('UserData', {}).get('Played')
+        return self.user_data().played
 
     @property
     def played(self):
@@ -146,11 +386,9 @@ class EmbyObject(object):
     @property
     def percentage_played(self):
         '''returns played percentage [0,1] of item'''
-        played = self.object_dict.get(
-            'UserData', {}
-        ).get('PlaybackPositionTicks')
+        played = self.user_data().position_ticks
         total = self.object_dict.get('RunTimeTicks') or played or 1
-        return (played or 0) / total
+        return played / total
 
     @property
     def duration(self):
@@ -160,28 +398,62 @@ class EmbyObject(object):
     @property
     def play_count(self):
         '''returns users playcount for item'''
-        return self.object_dict.get('UserData', {}).get('PlayCount', 0)
+        return self.user_data().play_count
 
     @property
     def favorite(self):
         '''returns True if user favorited item'''
-        return self.object_dict.get('UserData', {}).get('IsFavorite', False)
+        return self.user_data().favorite
 
     @async_func
-    async def _mark(self, type, value):
+    async def _mark(self, type, value, user_id=None):
         url = '/Users/{{UserId}}/{type}/{id}'.format(type=type, id=self.id)
         if value:
-            (await self.connector.post(url)).close()
+            status, _ = await self.connector.post(
+                url, remote=False, userId=user_id
+            )
         else:
-            (await self.connector.delete(url)).close()
+            status = await self.connector.delete(
+                url, remote=False, userId=user_id
+            )
+        if status < 400:
+            self.known_objects.update_user_data(
+                user_id or self.connector.userid, self.id,
+                **{_MARK_FIELDS[type]: bool(value)}
+            )
+        return status
 
     @async_func
-    async def setFavorite(self, value=True):
-        await self._mark('FavoriteItems', value)
+    async def setFavorite(self, value=True, user_id=None):
+        '''(un)mark the item as a favorite
+
+        |coro|
+
+        Parameters
+        ----------
+        value : bool, optional
+          favorite or not (default True)
+        user_id : str, optional
+          for whom, default - the connector's user
+
+        Returns
+        -------
+        int
+          http status of the request
+        '''
+        return await self._mark('FavoriteItems', value, user_id)
 
     @async_func
-    async def setWatched(self, value=True):
-        await self._mark('PlayedItems', value)
+    async def setWatched(self, value=True, user_id=None):
+        '''mark the item as (un)played
+
+        |coro|
+
+        Parameters
+        ----------
+          same as `setFavorite`
+        '''
+        return await self._mark('PlayedItems', value, user_id)
 
     @property
     def type(self):
@@ -212,11 +484,12 @@ class EmbyObject(object):
           post :
           tags :
         '''
+        self._watch()
         return self.object_dict.get('Genres', [])
 
     @genres.setter
     def genres(self, genres: list):
-        self.object_dict['Genres'] = genres
+        self._set('Genres', genres)
 
     @property
     def tags(self):
@@ -227,11 +500,12 @@ class EmbyObject(object):
           post :
           genres :
         '''
+        self._watch()
         return self.object_dict.get('Tags', [])
 
     @tags.setter
     def tags(self, tags: list):
-        self.object_dict['Tags'] = tags
+        self._set('Tags', tags)
 
     @property
     def overview(self):
@@ -245,7 +519,7 @@ class EmbyObject(object):
 
     @overview.setter
     def overview(self, value):
-        self.object_dict['Overview'] = value
+        self._set('Overview', value)
 
     @property
     def community_rating(self):
@@ -259,7 +533,7 @@ class EmbyObject(object):
 
     @community_rating.setter
     def community_rating(self, value):
-        self.object_dict['CommunityRating'] = value
+        self._set('CommunityRating', value)
 
     @property
     def primary_image_url(self):
@@ -267,6 +541,20 @@ class EmbyObject(object):
         path = '/Items/{}/Images/Primary'.format(self.id)
         return self.connector.get_url(path, attach_api_key=False)
 
+    def _get_date(self, key):
+        # parsed dates are memoized along with the string they came from,
+        # so setters/updates that replace the string invalidate them
+        ts = self.object_dict.get(key)
+        if not ts:
+            return None
+        if self._dates is None:
+            self._dates = {}
+        raw, parsed = self._dates.get(key, (None, None))
+        if raw != ts:
+            parsed = parse_datetime(ts)
+            self._dates[key] = (ts, parsed)
+        return parsed
+
     @property
     def date(self):
         """alias of premier_date"""
@@ -279,10 +567,7 @@ class EmbyObject(object):
     @property
     def premier_date(self):
         """datetime of when the item premiered (aired/released) (or None)"""
-        ts = self.object_dict.get('PremiereDate')
-        if not ts:
-            return None
-        return arrow.get(ts).datetime
+        return self._get_date('PremiereDate')
 
     @premier_date.setter
     def premier_date(self, value):
@@ -290,15 +575,12 @@ class EmbyObject(object):
             value = value.strftime("%Y-%m-%dT%H:%M:%SZ")
         elif not isinstance(value, str):
             raise ValueError('value must be datetime or str')
-        self.object_dict['PremiereDate'] = value
+        self._set('PremiereDate', value)
 
     @property
     def date_created(self):
         """datetime of when the item was added to the server (or None)"""
-        ts = self.object_dict.get('DateCreated')
-        if not ts:
-            return None
-        return arrow.get(ts).datetime
+        return self._get_date('DateCreated')
 
     @date_created.setter
     def date_created(self, value):
@@ -306,7 +588,7 @@ class EmbyObject(object):
             value = value.strftime("%Y-%m-%dT%H:%M:%SZ")
         elif not isinstance(value, str):
             raise ValueError('value must be datetime or str')
-        self.object_dict['DateCreated'] = value
+        self._set('DateCreated', value)
 
     @property
     def parent_id(self):
@@ -316,7 +598,7 @@ class EmbyObject(object):
         --------
           parent :
         '''
-        return self.object_dict.get('ParentId')
+        return expand_id(self.object_dict.get('ParentId'))
 
     @property
     @async_func
@@ -375,8 +657,17 @@ class EmbyObject(object):
             remote=False,
             Fields='Path,Overview,PremiereDate'+(',' if fields else '')+fields
         )
-        self.object_dict.update(info)
-        self.extras = {}
+        info = self.connector.ingest(info)
+        user_data = info.pop('UserData', None)
+        if user_data is not None:
+            self.known_objects.set_user_data(
+                self.connector.userid, self.id, user_data
+            )
+        reindex = self.known_objects.changes_index(self.object_dict, info)
+        self._merge(info)
+        if reindex:
+            self.known_objects.reindex(self)
+        self.extras = None
         return self
 
     @async_func
@@ -392,7 +683,7 @@ class EmbyObject(object):
         return await self.update()
 
     @async_func
-    async def send(self):
+    async def send(self, force=False):
         '''send data that was changed to emby
 
         |coro|
@@ -400,25 +691,42 @@ class EmbyObject(object):
         This should be used after using any of the setter.
         Not necessarily immediately, but soon after.
 
+        Parameters
+        ----------
+        force : bool, optional
+          send even if no field was changed (default False)
+
+        Returns
+        -------
+        tuple
+          (status, response text), `(304, '')` if nothing was sent
+
         See Also
         --------
           post: same thing
           update :
           refresh :
+          dirty :
         '''
+        if not force and not self._changed():
+            return 304, ''
+
         # Why does the whole dict need to be sent?
         #   because emby is dumb, and will break if I don't
-        data = {**_EMPTY_OBJ, **self.object_dict}
+        data = {**_EMPTY_OBJ, **expand_ids(self.object_dict)}
 
+        # servers accept either encoding, not both - try raw json first
+        # and remember what worked, so the fallback happens once
+        send_raw = self.connector.send_raw
         path = 'Items/{}'.format(self.id)
         status, resp = await self.connector.post(
             path,
             data=data,
             remote=False,
-            send_raw=True,
+            send_raw=send_raw is not False,
             headers={'Content-Type': 'application/json'},
         )
-        if status in (400, 415):
+        if status in (400, 415) and send_raw is None:
             await EmbyObject(self.object_dict, self.connector).update()
             status, resp = await self.connector.post(
                 path,
@@ -427,10 +735,16 @@ class EmbyObject(object):
                 send_raw=False,
                 headers={'Content-Type': 'application/json'},
             )
+            if status < 400:
+                self.connector.remember_send_raw(False)
+        elif status < 400 and send_raw is None:
+            self.connector.remember_send_raw(True)
+        if status < 400:
+            self._clean()
         return status, resp
 
     @async_func
-    async def post(self):
+    async def post(self, force=False):
         '''Same as send
 
         |coro|
@@ -439,10 +753,10 @@ class EmbyObject(object):
         --------
           send :
         '''
-        return await self.send()
+        return await self.send(force)
 
     @async_func
-    async def process(self, object_dict):
+    async def process(self, object_dict, user_id=None):
         '''[for internal use] convert json/dict into python object
 
         |coro|
@@ -451,6 +765,9 @@ class EmbyObject(object):
         ----------
         object_dict : dict
           json representation of object from emby
+        user_id : str, optional
+          user the json was fetched as, its `UserData` is stored for
+          that user (default - the connector's user)
 
         Notes
         -----
@@ -468,7 +785,7 @@ class EmbyObject(object):
         # and update it to get full dict
         try:
             if type(object_dict) == str:
-                existing = EmbyObject.known_objects.get(object_dict)
+                existing = self.known_objects.get(object_dict)
                 if existing:
                     return existing
 
@@ -497,7 +814,7 @@ class EmbyObject(object):
         if type(object_dict) == list:
             items = []
             for item in object_dict:
-                item = await self.process(item)
+                item = await self.process(item, user_id)
                 if item:
                     items.append(item)
             return items
@@ -509,12 +826,27 @@ class EmbyObject(object):
         if 'Id' not in object_dict and 'ItemId' not in object_dict:
             return object_dict
 
+        # intern/prune/compact the dict before it is stored
+        object_dict = self.connector.ingest(object_dict)
+
+        # play state is kept per user, apart from the shared dict
+        itemId = object_dict.get('Id', object_dict.get('ItemId'))
+        user_data = object_dict.pop('UserData', None)
+        if user_data is not None:
+            self.known_objects.set_user_data(
+                user_id or self.connector.userid, expand_id(itemId), user_data
+            )
+
         # if object is already stored,
         #   update with existing info and return
-        itemId = object_dict.get('Id', object_dict.get('ItemId'))
-        existing = EmbyObject.known_objects.get(itemId)
+        existing = self.known_objects.get(itemId)
         if existing:
-            existing.object_dict.update(object_dict)
+            reindex = self.known_objects.changes_index(
+                existing.object_dict, object_dict
+            )
+            existing._merge(object_dict)
+            if reindex:
+                self.known_objects.reindex(existing)
             return existing
 
         import embypy.objects.folders
@@ -525,7 +857,10 @@ class EmbyObject(object):
         #   figure out its type (if unknown use this base class)
         #   create an object with subclass of that type
         #   return
-        if 'AppName' in object_dict:
+        if type(object_dict) != dict:
+            # typed items have a known type
+            pass
+        elif 'AppName' in object_dict:
             object_dict['Type'] = 'Device'
         elif 'HasPassword' in object_dict:
             object_dict['Type'] = 'User'
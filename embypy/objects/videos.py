@@ -1,5 +1,6 @@
 from embypy.objects.object import EmbyObject
 from embypy.utils.asyncio import async_func
+from embypy.utils.ingest import expand_id
 
 
 # Generic class
@@ -13,6 +14,8 @@ class Video(EmbyObject):
       connector : embypy.utils.connector.Connector
         same as for `EmbyObject`
     '''
+    __slots__ = ()
+
     def __init__(self, object_dict, connector):
         super().__init__(object_dict, connector)
 
@@ -44,6 +47,8 @@ class Movie(Video):
       connector : embypy.utils.connector.Connector
         same as for `EmbyObject`
     '''
+    __slots__ = ()
+
     def __init__(self, object_dict, connector):
         super().__init__(object_dict, connector)
 
@@ -63,6 +68,8 @@ class Episode(Video):
       connector : embypy.utils.connector.Connector
         same as for `EmbyObject`
     '''
+    __slots__ = ()
+
     def __init__(self, object_dict, connector):
         super().__init__(object_dict, connector)
 
@@ -78,7 +85,7 @@ class Episode(Video):
 
     @index_number.setter
     def index_number(self, value):
-        self.object_dict['IndexNumber'] = value
+        self._set('IndexNumber', value)
 
     @property
     def episode_number(self):
@@ -92,7 +99,7 @@ class Episode(Video):
     @property
     def season_id(self):
         '''season name'''
-        return self.object_dict.get('SeasonId')
+        return expand_id(self.object_dict.get('SeasonId'))
 
     @property
     def season_name(self):
@@ -106,7 +113,7 @@ class Episode(Video):
 
     @season_id.setter
     def season_id(self, value):
-        self.object_dict['SeasonId'] = value
+        self._set('SeasonId', value)
 
     @property
     @async_func
@@ -124,7 +131,7 @@ class Episode(Video):
     @property
     def series_id(self):
         '''The emby id of the series this episode belongs to'''
-        return self.object_dict.get('SeriesId')
+        return expand_id(self.object_dict.get('SeriesId'))
 
     @property
     @async_func
@@ -165,6 +172,8 @@ class Trailer(Video):
       connector : embypy.utils.connector.Connector
         same as for `EmbyObject`
     '''
+    __slots__ = ()
+
     def __init__(self, object_dict, connector):
         super().__init__(object_dict, connector)
 
@@ -179,6 +188,8 @@ class AdultVideo(Video):
       connector : embypy.utils.connector.Connector
         same as for `EmbyObject`
     '''
+    __slots__ = ()
+
     def __init__(self, object_dict, connector):
         super().__init__(object_dict, connector)
 
@@ -193,5 +204,7 @@ class MusicVideo(Video):
       connector : embypy.utils.connector.Connector
         same as for `EmbyObject`
     '''
+    __slots__ = ()
+
     def __init__(self, object_dict, connector):
         super().__init__(object_dict, connector)
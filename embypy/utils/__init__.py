@@ -1,3 +1,8 @@
 #!/usr/bin/env python3
 
 from embypy.utils.connector import Connector
+from embypy.utils.cache import ObjectCache
+from embypy.utils.deadline import Deadline, DeadlineExceeded
+from embypy.utils.capabilities import ServerCapabilities
+from embypy.utils.dates import parse_datetime
+from embypy.utils.query import ItemQuery
@@ -0,0 +1,112 @@
+import asyncio
+import time
+from collections import namedtuple
+
+BulkResult = namedtuple('BulkResult', ['item', 'ok', 'value', 'error'])
+BulkResult.__doc__ = '''outcome of one item of a bulk operation
+
+`value` is what the operation returned, `error` the exception it
+raised (or None).
+'''
+
+
+class _Throttle:
+    '''spaces out the start of operations to at most `rate` per second'''
+    def __init__(self, rate):
+        self.interval	= 1 / rate if rate else 0
+        self._next	= 0
+        self._lock	= asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def run_bulk(
+    func, items, concurrency=8, chunk_size=100, rate=None,
+    progress=None, check=None, retries=0, retry=None, backoff=0.5,
+    key=None,
+):
+    '''apply a coroutine function to many items concurrently
+
+    Parameters
+    ----------
+    func : callable
+      `async def func(item)`, called once per item
+    items : array_like
+      the items to process
+    concurrency : int, optional
+      max number of items in flight (default 8)
+    chunk_size : int, optional
+      items are processed in chunks of this size, `progress` is
+      called after each chunk (default 100)
+    rate : float, optional
+      max number of operations started per second (default - no limit)
+    progress : callable, optional
+      `progress(done, total)` - called after every chunk
+    check : callable, optional
+      `check(value) -> bool` - whether a returned value means success
+      (default - everything that did not raise succeeded)
+    retries : int, optional
+      how often a failed item is tried again (default 0)
+    retry : callable, optional
+      `retry(value) -> bool` - whether a failed value is worth retrying
+      (default - only exceptions are retried)
+    backoff : float, optional
+      seconds to wait before the first retry, doubled every time
+    key : callable, optional
+      `key(item)` - items with the same key are only processed once,
+      they all get the result of the first one
+
+    Returns
+    -------
+    list
+      of :class:`BulkResult`, in the order of `items`
+    '''
+    items = list(items)
+    if key is not None:
+        first = {}
+        for item in items:
+            first.setdefault(key(item), item)
+        unique = list(first.values())
+    else:
+        unique = items
+    running = asyncio.Semaphore(concurrency)
+    throttle = _Throttle(rate)
+
+    async def attempt(item):
+        await throttle.wait()
+        try:
+            value = await func(item)
+        except Exception as e:
+            return BulkResult(item, False, None, e), True
+        ok = check(value) if check else True
+        return BulkResult(item, ok, value, None), \
+            not ok and retry is not None and retry(value)
+
+    async def run(item):
+        for i in range(retries + 1):
+            async with running:
+                result, again = await attempt(item)
+            if not again or i == retries:
+                return result
+            await asyncio.sleep(backoff * 2**i)
+
+    results = []
+    size = chunk_size or len(unique) or 1
+    for start in range(0, len(unique), size):
+        chunk = unique[start:start + size]
+        results.extend(await asyncio.gather(*map(run, chunk)))
+        if progress:
+            progress(len(results), len(unique))
+
+    if key is None:
+        return results
+    done = {key(result.item): result for result in results}
+    return [done[key(item)]._replace(item=item) for item in items]
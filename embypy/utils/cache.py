@@ -0,0 +1,539 @@
+import sys
+import time
+import threading
+import weakref
+from collections import OrderedDict
+
+from embypy.utils.ingest import compact_id
+from embypy.utils.search import TEXT_FIELDS, SearchIndex
+from embypy.utils.userdata import EMPTY_USER_DATA, UserDataStore
+
+
+_MISSING = object()
+
+
+class ObjectCache:
+    '''Identity map of emby objects, one per connector
+
+    Parameters
+    ----------
+    mode : str, optional
+      `'lru'` (default) keeps strong references and evicts the least
+      recently used objects once `max_size` is reached,
+      `'weak'` only keeps objects alive for as long as something
+      else references them
+    max_size : int, optional
+      max number of objects to keep (lru mode only), None = unbounded
+    ttl : float, optional
+      number of seconds an object stays cached (lru mode only),
+      None = forever
+    compact_ids : bool, optional
+      key objects by 16 byte ids (see `embypy.utils.ingest.compact_id`)
+    search_index : bool, optional
+      maintain a `embypy.utils.search.SearchIndex` of cached names
+      (default False)
+
+    Notes
+    -----
+    All operations are guarded by a lock, so a single cache can be
+    shared between threads and event loops.
+    Play state (`UserData`) is kept per user in `user_data`, so objects
+    are shared between users. The play state of evicted (or expired)
+    objects is kept until they are garbage collected.
+    '''
+    def __init__(
+        self, mode='lru', max_size=None, ttl=None, compact_ids=False,
+        search_index=False,
+    ):
+        if mode not in ('lru', 'weak'):
+            raise ValueError('cache mode must be "lru" or "weak"', mode)
+        self.mode	= mode
+        self.max_size	= max_size
+        self.ttl	= ttl
+        self.compact_ids	= compact_ids
+        self._lock	= threading.RLock()
+        self._hits	= 0
+        self._misses	= 0
+        self._evictions	= 0
+        self._expired	= 0
+        self.index	= ObjectIndex(self._key)
+        self.search	= SearchIndex() if search_index else None
+        self.user_data	= UserDataStore()
+        self._dirty	= {}
+        # json keys the indexes are built from
+        self.indexed_keys	= frozenset(
+            (*ObjectIndex.FIELDS.values(), 'ProviderIds', 'Id', 'ItemId')
+        ) | (frozenset((*TEXT_FIELDS, 'Type')) if search_index else set())
+        if mode == 'weak':
+            self._objects = weakref.WeakValueDictionary()
+        else:
+            self._objects = OrderedDict()
+
+    def _key(self, item_id):
+        return compact_id(item_id) if self.compact_ids else item_id
+
+    def __len__(self):
+        return len(self._objects)
+
+    def __contains__(self, item_id):
+        return self.get(item_id, count=False) is not None
+
+    def _expired_at(self, stamp):
+        return self.ttl is not None and time.monotonic() - stamp > self.ttl
+
+    def get(self, item_id, default=None, count=True):
+        '''get a cached object by id
+
+        Parameters
+        ----------
+        item_id : str
+          emby id of the object
+        default : optional
+          returned if the object is not cached
+        count : bool, optional
+          if false, the lookup does not affect hit/miss statistics
+
+        Returns
+        -------
+        EmbyObject
+          the cached object (or `default`)
+        '''
+        if not item_id:
+            return default
+        item_id = self._key(item_id)
+        with self._lock:
+            if self.mode == 'weak':
+                obj = self._objects.get(item_id)
+            else:
+                obj, stamp = self._objects.get(item_id, (None, 0))
+                if obj is not None and self._expired_at(stamp):
+                    self._evict(item_id)
+                    self._expired += 1
+                    obj = None
+                elif obj is not None:
+                    self._objects.move_to_end(item_id)
+            if count:
+                if obj is None:
+                    self._misses += 1
+                else:
+                    self._hits += 1
+            return default if obj is None else obj
+
+    def add(self, obj):
+        '''store an object, keyed by its id
+
+        Parameters
+        ----------
+        obj : EmbyObject
+          object to cache
+
+        Returns
+        -------
+        EmbyObject
+          the object now stored under that id - if another live object
+          was already cached, that one is kept and returned instead
+        '''
+        item_id = obj.object_dict.get('Id') or obj.object_dict.get('ItemId')
+        if not item_id:
+            return obj
+        item_id = self._key(item_id)
+        with self._lock:
+            existing = self.get(item_id, count=False)
+            if existing is not None:
+                return existing
+            if self.mode == 'weak':
+                self._objects[item_id] = obj
+                # drop the index entries, user data, ... with the object
+                finalizer = weakref.finalize(obj, self._collected, item_id)
+                finalizer.atexit = False
+            else:
+                self._objects[item_id] = (obj, time.monotonic())
+            self._index(item_id, obj)
+            while self.mode == 'lru' and \
+                    self.max_size is not None and \
+                    len(self._objects) > self.max_size:
+                self._evict(next(iter(self._objects)))
+                self._evictions += 1
+            return obj
+
+    def pop(self, item_id, default=None):
+        '''remove an object from the cache and return it'''
+        with self._lock:
+            obj = self.get(item_id, count=False)
+            if obj is None:
+                return default
+            self._discard(self._key(item_id))
+            return obj
+
+    def _evict(self, item_id):
+        # the caller may still hold the object, so its user data is kept
+        # until the object is garbage collected
+        obj, _ = self._objects[item_id]
+        self._discard(item_id, user_data=False)
+        finalizer = weakref.finalize(obj, self._collected_user_data, item_id)
+        finalizer.atexit = False
+
+    def _discard(self, item_id, user_data=True):
+        self._objects.pop(item_id, None)
+        self.index.remove(item_id)
+        if user_data:
+            self.user_data.remove(item_id)
+        if self.search is not None:
+            # the type can not be answered from the cache alone anymore
+            self.search.complete_types.discard(self.search.remove(item_id))
+
+    def _collected(self, item_id):
+        # a weakly cached object was garbage collected
+        with self._lock:
+            if self._objects.get(item_id) is None:
+                self._discard(item_id)
+
+    def _collected_user_data(self, item_id):
+        # an evicted object was garbage collected
+        with self._lock:
+            if self.get(item_id, count=False) is None:
+                self.user_data.remove(item_id)
+
+    def reindex(self, obj):
+        '''update the secondary indexes after `obj.object_dict` changed
+
+        Parameters
+        ----------
+        obj : EmbyObject
+          a cached object
+        '''
+        item_id = obj.object_dict.get('Id') or obj.object_dict.get('ItemId')
+        if not item_id:
+            return
+        item_id = self._key(item_id)
+        with self._lock:
+            if self.get(item_id, count=False) is obj:
+                self._index(item_id, obj)
+
+    def changes_index(self, object_dict, update):
+        '''whether applying `update` to `object_dict` changes an index
+
+        Parameters
+        ----------
+        object_dict : dict
+          the stored item dict
+        update : dict
+          (partial) item dict about to be merged into it
+        '''
+        get = object_dict.get
+        return any(
+            get(key, _MISSING) != update[key]
+            for key in self.indexed_keys if key in update
+        )
+
+    def _index(self, item_id, obj):
+        self.index.add(item_id, obj.object_dict)
+        if self.search is not None:
+            self.search.add(item_id, obj.object_dict)
+
+    def mark_dirty(self, obj):
+        '''remember an object with unsent changes
+
+        Dirty objects are held strongly until they are clean again,
+        so changes are not lost to eviction.
+        '''
+        item_id = obj.object_dict.get('Id') or obj.object_dict.get('ItemId')
+        if item_id:
+            with self._lock:
+                self._dirty[self._key(item_id)] = obj
+
+    def mark_clean(self, obj):
+        '''forget an object registered with `mark_dirty`'''
+        item_id = obj.object_dict.get('Id') or obj.object_dict.get('ItemId')
+        if item_id:
+            with self._lock:
+                if self._dirty.get(self._key(item_id)) is obj:
+                    del self._dirty[self._key(item_id)]
+
+    def dirty(self):
+        '''list of objects with unsent changes'''
+        with self._lock:
+            return list(self._dirty.values())
+
+    def set_user_data(self, user_id, item_id, data):
+        '''store a user's `UserData` json for an item
+
+        Parameters
+        ----------
+        user_id : str
+          emby id of the user
+        item_id : str
+          emby id of the item
+        data : dict
+          the `UserData` dict emby sent with the item
+        '''
+        with self._lock:
+            self.user_data.set(user_id, self._key(item_id), data)
+
+    def update_user_data(self, user_id, item_id, **fields):
+        '''change part of a user's play state of an item
+
+        Parameters
+        ----------
+        fields :
+          fields of `embypy.utils.userdata.UserData`, e.g. `played=True`
+        '''
+        with self._lock:
+            self.user_data.update(user_id, self._key(item_id), **fields)
+
+    def get_user_data(self, user_id, item_id, default=EMPTY_USER_DATA):
+        '''a user's play state of an item
+
+        Parameters
+        ----------
+        default : optional
+          returned if nothing was stored (default - all false/0)
+
+        Returns
+        -------
+        embypy.utils.userdata.UserData
+          named tuple
+        '''
+        with self._lock:
+            return self.user_data.get(user_id, self._key(item_id), default)
+
+    def find(self, index, value):
+        '''cached objects with a given value in one of the indexes
+
+        Parameters
+        ----------
+        index : str
+          one of `'provider'`, `'path'`, `'parent'`, `'series'`,
+          `'season'` or `'album'`
+        value : str, tuple
+          value to look up - for `'provider'` a (provider, id) tuple,
+          e.g. `('Tmdb', '603')`, otherwise the path or parent/series/...
+          id
+
+        Returns
+        -------
+        list
+          matching objects (in no particular order)
+        '''
+        with self._lock:
+            found = []
+            for item_id in self.index.find(index, value):
+                obj = self.get(item_id, count=False)
+                if obj is None:
+                    # weakly referenced objects are dropped lazily
+                    self.index.remove(item_id)
+                else:
+                    found.append(obj)
+            return found
+
+    def values(self):
+        '''list of all live cached objects'''
+        with self._lock:
+            if self.mode == 'weak':
+                return list(self._objects.values())
+            return [
+                obj for obj, stamp in self._objects.values()
+                if not self._expired_at(stamp)
+            ]
+
+    def clear(self):
+        '''remove every object from the cache'''
+        with self._lock:
+            for item_id in list(self._objects):
+                self._discard(item_id)
+            self.user_data.clear()
+            if self.search is not None:
+                self.search.complete_types.clear()
+
+    def memory_usage(self):
+        '''approximate number of bytes held by cached objects
+
+        Returns
+        -------
+        dict
+          maps object type to a dict with the `count` of objects and
+          total `bytes` (object plus its json dict)
+        '''
+        usage = {}
+        for obj in self.values():
+            entry = usage.setdefault(obj.type, {'count': 0, 'bytes': 0})
+            entry['count'] += 1
+            entry['bytes'] += sys.getsizeof(obj) + deep_sizeof(obj.object_dict)
+        return usage
+
+    def search_items(self, query, types=None, limit=None):
+        '''search the names of cached objects
+
+        Parameters
+        ----------
+        query : str
+          search string
+        types : iterable, optional
+          only include objects of these types
+        limit : int, optional
+          max number of results
+
+        Returns
+        -------
+        list
+          matching objects, best match first
+
+        Notes
+        -----
+        requires `search_index=True`
+        '''
+        if self.search is None:
+            raise RuntimeError('search index is not enabled')
+        with self._lock:
+            found = []
+            for item_id in self.search.search(query, types):
+                obj = self.get(item_id, count=False)
+                if obj is None:
+                    self._discard(item_id)
+                    continue
+                found.append(obj)
+                if limit and len(found) >= limit:
+                    break
+            return found
+
+    def mark_complete(self, types):
+        '''record that every item of these types was just cached
+
+        Only kept when nothing can be evicted (unbounded lru without ttl),
+        otherwise the search index could silently miss items.
+        '''
+        if self.search is not None and self.mode == 'lru' and \
+           self.max_size is None and self.ttl is None:
+            with self._lock:
+                self.search.mark_complete(types)
+
+    def index_memory_usage(self):
+        '''approximate number of bytes used by each secondary index'''
+        with self._lock:
+            usage = self.index.memory_usage()
+            usage['user_data'] = self.user_data.memory_usage()
+            if self.search is not None:
+                usage['search'] = deep_sizeof(vars(self.search))
+            return usage
+
+    def stats(self):
+        '''cache statistics
+
+        Returns
+        -------
+        dict
+          size, hits, misses, hit_rate, evictions and expired counts
+        '''
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'mode':		self.mode,
+                'size':		len(self._objects),
+                'max_size':	self.max_size,
+                'hits':		self._hits,
+                'misses':	self._misses,
+                'hit_rate':	self._hits / lookups if lookups else 0.0,
+                'evictions':	self._evictions,
+                'expired':	self._expired,
+            }
+
+
+class ObjectIndex:
+    '''Secondary indexes (value -> set of ids) over cached item dicts
+
+    Parameters
+    ----------
+    key : callable
+      normalizes ids (see `ObjectCache.compact_ids`)
+
+    Notes
+    -----
+    Used internally by `ObjectCache`, which holds the lock.
+    '''
+    FIELDS = {
+        'path':		'Path',
+        'parent':	'ParentId',
+        'series':	'SeriesId',
+        'season':	'SeasonId',
+        'album':	'AlbumId',
+    }
+
+    def __init__(self, key):
+        self._key	= key
+        self._indexes	= {name: {} for name in (*self.FIELDS, 'provider')}
+        self._entries	= {}
+
+    def _normalize(self, index, value):
+        if index == 'provider':
+            provider, value = value
+            return (provider.lower(), str(value))
+        if index == 'path':
+            return value
+        return self._key(value)
+
+    def _entries_for(self, object_dict):
+        entries = []
+        for index, field in self.FIELDS.items():
+            value = object_dict.get(field)
+            if value:
+                entries.append((index, self._normalize(index, value)))
+        providers = object_dict.get('ProviderIds') or {}
+        for provider, value in providers.items():
+            if value:
+                entries.append(('provider', (provider.lower(), str(value))))
+        return tuple(entries)
+
+    def add(self, item_id, object_dict):
+        '''(re)index an item'''
+        self.remove(item_id)
+        entries = self._entries_for(object_dict)
+        for index, value in entries:
+            self._indexes[index].setdefault(value, set()).add(item_id)
+        if entries:
+            self._entries[item_id] = entries
+
+    def remove(self, item_id):
+        '''drop an item from every index'''
+        for index, value in self._entries.pop(item_id, ()):
+            ids = self._indexes[index].get(value)
+            if ids is not None:
+                ids.discard(item_id)
+                if not ids:
+                    del self._indexes[index][value]
+
+    def find(self, index, value):
+        '''ids with a given value in an index'''
+        if index not in self._indexes:
+            raise ValueError('unknown index', index)
+        value = self._normalize(index, value)
+        return list(self._indexes[index].get(value, ()))
+
+    def memory_usage(self):
+        '''approximate bytes per index (plus the reverse `entries` map)'''
+        usage = {
+            index: deep_sizeof(values)
+            for index, values in self._indexes.items()
+        }
+        usage['entries'] = deep_sizeof(self._entries)
+        return usage
+
+
+def deep_sizeof(value, seen=None):
+    '''approximate size in bytes of a json-like value (dicts, lists, ...)'''
+    if seen is None:
+        seen = set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += deep_sizeof(key, seen) + deep_sizeof(item, seen)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += deep_sizeof(item, seen)
+    elif hasattr(type(value), '__struct_fields__'):
+        # typed items (msgspec structs)
+        for field in value.__struct_fields__:
+            size += deep_sizeof(getattr(value, field), seen)
+    return size
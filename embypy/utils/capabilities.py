@@ -0,0 +1,111 @@
+from collections import namedtuple
+
+# feature -> minimum server version, per server flavor
+FEATURES = {
+    # `enableTotalRecordCount=false` skips counting all matches
+    'optional_total_count':	{'emby': (4, 0), 'jellyfin': (10, 0)},
+}
+
+# how the server takes item updates (one of them, once found out by a
+# send), see `embypy.objects.EmbyObject.send`
+SEND_FEATURES = {True: 'item_json_raw', False: 'item_json_string'}
+
+
+def _version(text):
+    try:
+        return tuple(int(part) for part in text.split('.'))
+    except (AttributeError, ValueError):
+        return ()
+
+
+class ServerCapabilities(
+    namedtuple('ServerCapabilities', ['flavor', 'version', 'features'])
+):
+    '''What the connected server is and which query features it has
+
+    Attributes
+    ----------
+    flavor : str
+      `'emby'`, `'jellyfin'` or `'unknown'`
+    version : tuple
+      server version, e.g. `(4, 7, 11, 0)`
+    features : frozenset
+      names of supported features (see `FEATURES` and `SEND_FEATURES`)
+
+    See Also
+    --------
+      embypy.utils.Connector.capabilities :
+    '''
+    __slots__ = ()
+
+    @classmethod
+    def from_info(cls, info, jellyfin=None):
+        '''derive capabilities from the `/System/Info/Public` response
+
+        Parameters
+        ----------
+        info : dict
+          the response
+        jellyfin : bool, optional
+          known flavor (overrides detection)
+        '''
+        info = info if isinstance(info, dict) else {}
+        version = _version(info.get('Version'))
+        product = (info.get('ProductName') or '').lower()
+        if jellyfin is not None:
+            flavor = 'jellyfin' if jellyfin else 'emby'
+        elif 'jellyfin' in product:
+            flavor = 'jellyfin'
+        elif 'emby' in product:
+            flavor = 'emby'
+        elif len(version) == 3:
+            # older servers send no product name, jellyfin went 10.x
+            flavor = 'jellyfin' if version[0] >= 10 else 'emby'
+        else:
+            flavor = 'unknown'
+        features = frozenset(
+            name for name, minimum in FEATURES.items()
+            if flavor in minimum and version >= minimum[flavor]
+        )
+        return cls(flavor, version, features)
+
+    @classmethod
+    def from_dict(cls, data):
+        '''reverse of `as_dict`'''
+        return cls(
+            data['flavor'], tuple(data['version']), frozenset(data['features'])
+        )
+
+    def as_dict(self):
+        '''json serializable form, to skip probing next time'''
+        return {
+            'flavor':	self.flavor,
+            'version':	list(self.version),
+            'features':	sorted(self.features),
+        }
+
+    @property
+    def jellyfin(self):
+        '''True for jellyfin servers'''
+        return self.flavor == 'jellyfin'
+
+    def supports(self, feature):
+        '''whether the server has a feature of `FEATURES`'''
+        return feature in self.features
+
+    @property
+    def send_raw(self):
+        '''how item updates are sent (see `Connector.send_raw`),
+        None if not known yet
+        '''
+        for value, feature in SEND_FEATURES.items():
+            if feature in self.features:
+                return value
+        return None
+
+    def with_send_raw(self, send_raw):
+        '''copy that records how item updates are sent'''
+        features = self.features.difference(SEND_FEATURES.values())
+        return self._replace(
+            features=features | {SEND_FEATURES[bool(send_raw)]}
+        )
@@ -1,4 +1,6 @@
+import contextvars
 import json
+import os
 import time
 from requests.compat import urlparse, urlunparse, urlencode
 import asyncio
@@ -10,7 +12,16 @@ import random
 import ssl
 
 from embypy import __version__
+from embypy.utils import deadline
 from embypy.utils.asyncio import async_func
+from embypy.utils.cache import ObjectCache
+from embypy.utils.capabilities import ServerCapabilities
+from embypy.utils.hedge import Hedger
+from embypy.utils.ingest import Ingester
+from embypy.utils.schema import _require_msgspec, json_loads, typed_loads
+
+# set in the login task, so its own requests do not wait for it
+_logging_in = contextvars.ContextVar('embypy_logging_in', default=False)
 
 
 class WebSocket:
@@ -95,14 +106,54 @@ class Connector:
       username for login (see notes)
     password : str, optional
       password for login (see notes)
+    token_file : str, optional
+      path of a file to keep the login token in, so new processes can
+      skip logging in (the token is refreshed when it is rejected)
     device_id : str
       device id as registered in emby
     timeout : int
       number of seconds to wait before timeout for a request
+      (an `embypy.utils.Deadline` can end it earlier)
     tries : int
       number of times to try a request before throwing an error
     jellyfin : bool
       if this is a jellyfin (false = emby) server
+    capabilities : dict, optional
+      result of an earlier probe (`ServerCapabilities.as_dict`),
+      skips probing the server
+    max_requests : int, optional
+      max number of requests sent at the same time (per event loop),
+      default 10, None for no limit
+    hedge : bool, optional
+      resend get requests that are slower than usual and use whichever
+      answer comes first (default False, see `hedge_stats`)
+    hedge_percentile : float, optional
+      latency percentile (per path) after which a get is resent,
+      default 0.95
+    hedge_budget : float, optional
+      max fraction of extra requests caused by hedging, default 0.05
+    send_raw : bool, optional
+      how item updates are encoded (see `post`), default None - taken
+      from `capabilities`, or tried on the first `EmbyObject.send` and
+      remembered there
+    cache : str, optional
+      how known objects are kept, `'lru'` (default) or `'weak'`
+      (see `embypy.utils.ObjectCache`)
+    cache_size : int, optional
+      max number of objects kept in the lru cache (default unbounded)
+    cache_ttl : float, optional
+      seconds an object is kept in the lru cache (default forever)
+    search_index : bool, optional
+      keep a local full text index of cached names (default False)
+    intern_strings : bool, optional
+      intern repeated values of item dicts (default True)
+    prune_fields : list, optional
+      item keys to drop before caching, e.g. `['MediaSources']`
+    compact_ids : bool, optional
+      store item ids as 16 byte values internally (default False)
+    typed : bool, optional
+      decode listed items straight into typed structs (default False),
+      requires msgspec, see `embypy.utils.schema.Item`
 
     Notes
     -----
@@ -118,6 +169,14 @@ class Connector:
     Jellyfin and emby have some url differences right now,
     so set jellyfin's url scheme to true/false
     [or None (default) for auto-detect]
+
+    Responses are decoded with msgspec if it is installed
+    (`pip install embypy[fast]`), otherwise with the json module.
+    With `typed=True` the items of listings are decoded in the same pass
+    into per type structs, whose typed fields are validated (and
+    converted where lossless, e.g. `"7.5"` to `7.5`) while the other
+    keys stay undecoded until used. `intern_strings`, `prune_fields`
+    and `compact_ids` only apply to items that are plain dicts.
     '''
     def __init__(self, url, **kargs):
         try:
@@ -142,18 +201,55 @@ class Connector:
         self.timeout	= kargs.get('timeout', 30)
         self.tries	= kargs.get('tries', 3)
         self.jellyfin	= kargs.get('jellyfin')
+        self.max_requests	= kargs.get('max_requests', 10)
+        self.send_raw	= kargs.get('send_raw')
+        self.hedger	= Hedger(
+            percentile	= kargs.get('hedge_percentile', 0.95),
+            budget	= kargs.get('hedge_budget', 0.05),
+        ) if kargs.get('hedge') else None
         self.url	= urlparse(url)
+        if kargs.get('typed'):
+            _require_msgspec()
+            self.loads	= typed_loads
+        else:
+            self.loads	= json_loads
         self.urlremote	= urlparse(urlremote) if urlremote else urlremote
 
-        self.attempt_login = False
+        self.ingest = Ingester(
+            intern		= kargs.get('intern_strings', True),
+            prune_fields	= kargs.get('prune_fields', ()),
+            compact_ids		= kargs.get('compact_ids', False),
+        )
+        self.known_objects = ObjectCache(
+            mode	= kargs.get('cache', 'lru'),
+            max_size	= kargs.get('cache_size'),
+            ttl		= kargs.get('cache_ttl'),
+            compact_ids	= self.ingest.compact_ids,
+            search_index	= kargs.get('search_index', False),
+        )
+
+        self.token_file	= kargs.get('token_file')
+        self._login_tasks = {}
+        self._probe_tasks = {}
+        self._capabilities = kargs.get('capabilities')
+        if isinstance(self._capabilities, dict):
+            self._capabilities = ServerCapabilities.from_dict(
+                self._capabilities
+            )
+        if self.send_raw is None and self._capabilities is not None:
+            self.send_raw = self._capabilities.send_raw
         self._session_locks = {}
         self._session_uses = {}
         self._sessions = {}
+        self._request_limits = {}
 
         if self.ssl and type(self.ssl) == str:
             self.ssl = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
             self.ssl.load_verify_locations(cafile=self.ssl)
 
+        if self.token_file and self.username and not self.token:
+            self._load_token()
+
         # connect to websocket is user wants to
         if 'ws' in kargs:
             self.ws = WebSocket(self, self.get_url(websocket=True), self.ssl)
@@ -170,9 +266,7 @@ class Connector:
             return self.__getattr__(name[:-5])
         return self.__getattribute__(name)
 
-    async def _get_session(self):
-        loop = asyncio.get_running_loop()
-        loop_id = hash(loop)
+    def _auth_headers(self):
         auth_header = 'MediaBrowser Client="{0}",Device="{0}",' \
                       'DeviceId="{1}",Version="{2}"'
         auth_header = auth_header.format('EmbyPy', self.device_id, __version__)
@@ -186,6 +280,12 @@ class Connector:
 
         if self.token:
             headers.update({'X-MediaBrowser-Token': self.token})
+        return headers
+
+    async def _get_session(self):
+        loop = asyncio.get_running_loop()
+        loop_id = hash(loop)
+        headers = self._auth_headers()
 
         async with await self._get_session_lock():
             session = self._sessions.get(loop_id)
@@ -209,12 +309,65 @@ class Connector:
             if session and self._session_uses[loop_id] <= 0:
                 await session.close()
                 self._sessions[loop_id] = None
+                # no requests left on this loop, it may be closed next
+                self._request_limits.pop(loop, None)
 
     async def _get_session_lock(self):
         loop = asyncio.get_running_loop()
         self._sessions[loop] = None
         return self._session_locks.setdefault(loop, asyncio.Lock())
 
+    def _request_limit(self):
+        loop = asyncio.get_running_loop()
+        limit = self._request_limits.get(loop)
+        if limit is None:
+            limit = asyncio.Semaphore(self.max_requests or 2**31)
+            self._request_limits[loop] = limit
+        return limit
+
+    @staticmethod
+    def _share_task(tasks, loop, coro):
+        # one in-flight task per loop, forgotten once it is done so
+        # finished loops are not kept alive
+        task = loop.create_task(coro)
+        tasks[loop] = task
+
+        def forget(task):
+            if tasks.get(loop) is task:
+                del tasks[loop]
+        task.add_done_callback(forget)
+        return task
+
+    @property
+    def hedge_stats(self):
+        '''counters of hedged requests (see `Hedger.stats`), or None
+
+        See Also
+        --------
+          embypy.utils.hedge.Hedger.stats :
+        '''
+        return self.hedger.stats() if self.hedger else None
+
+    async def _bounded(self, request):
+        # waiting for a slot, logging in, retries and reading the body
+        # all count against the current deadline
+        left = deadline.remaining()
+        if left is None:
+            return await request
+        if left <= 0:
+            request.close()
+            raise deadline.DeadlineExceeded()
+        try:
+            return await asyncio.wait_for(request, left)
+        except asyncio.TimeoutError:
+            raise deadline.DeadlineExceeded()
+
+    async def _hedged(self, func, path, **query):
+        # only for idempotent requests - the same request may be sent twice
+        if self.hedger is None:
+            return await func(path, **query)
+        return await self.hedger.run(path, lambda: func(path, **query))
+
     @async_func
     async def info(self):
         return await self.getJson(
@@ -222,20 +375,91 @@ class Connector:
             remote=False,
         )
 
+    @property
+    @async_func
+    async def capabilities(self):
+        '''flavor, version and query features of the server
+
+        |coro|
+
+        Probed once per connector (concurrent callers share the
+        request), or taken from the `capabilities` argument.
+
+        Returns
+        -------
+        embypy.utils.capabilities.ServerCapabilities
+        '''
+        if self._capabilities is None:
+            loop = asyncio.get_running_loop()
+            task = self._probe_tasks.get(loop)
+            if task is None:
+                task = self._share_task(
+                    self._probe_tasks, loop, self._probe()
+                )
+            await self._bounded(self._wait_for_probe(task))
+        return self._capabilities
+
+    @staticmethod
+    async def _wait_for_probe(task):
+        # the caller may give up, the probe goes on for the next one
+        await asyncio.shield(task)
+
+    async def _probe(self):
+        # shared by every caller, so not bound to the deadline of the
+        # one that started it
+        deadline.clear()
+        try:
+            info = await self.info()
+        except Exception:
+            # unknown server - every feature is treated as missing
+            info = {}
+        if self._capabilities is None:
+            capabilities = ServerCapabilities.from_info(info, self.jellyfin)
+            if self.send_raw is not None:
+                capabilities = capabilities.with_send_raw(self.send_raw)
+            self._capabilities = capabilities
+
+    def remember_send_raw(self, send_raw):
+        '''record which encoding of item updates the server took
+
+        Kept in `send_raw` and in the capabilities, so a saved
+        `ServerCapabilities.as_dict` skips finding out again.
+        '''
+        self.send_raw = send_raw
+        if self._capabilities is not None:
+            self._capabilities = self._capabilities.with_send_raw(send_raw)
+
     @property
     @async_func
     async def is_jellyfin(self):
         if self.jellyfin is None:
-            self.jellyfin = False
-            info = await self.info()
-            try:
-                ver = tuple(map(int, info.get('Version', '0.0.0').split('.')))
-                if len(ver) == 3 and ver[0] >= 10:
-                    self.jellyfin = True
-            except ValueError:
-                pass
+            self.jellyfin = (await self.capabilities).jellyfin
         return self.jellyfin
 
+    def _load_token(self):
+        try:
+            with open(self.token_file) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        # only reuse tokens of the same user on the same server
+        if saved.get('Server') == self.url.geturl() and \
+           saved.get('Username') == self.username and saved.get('Token'):
+            self.token = self.api_key = saved['Token']
+            self.userid = saved.get('UserId') or self.userid
+
+    def _save_token(self):
+        tmp = self.token_file + '.tmp'
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump({
+                'Server':	self.url.geturl(),
+                'Username':	self.username,
+                'UserId':	self.userid,
+                'Token':	self.token,
+            }, f)
+        os.replace(tmp, self.token_file)
+
     @async_func
     async def login_if_needed(self):
         # authenticate to emby if password was given
@@ -243,35 +467,61 @@ class Connector:
             return await self.login()
 
     @async_func
-    async def login(self):
-        if not self.username or self.attempt_login:
+    async def login(self, stale_token=None):
+        '''log in with the username/password, getting a new token
+
+        |coro|
+
+        Concurrent calls (e.g. from several requests that got a 401)
+        share one login request per event loop.
+
+        Parameters
+        ----------
+        stale_token : str, optional
+          the token that was rejected - if the token changed since,
+          someone else already logged in and nothing is done
+        '''
+        if not self.username:
+            return
+        if stale_token is not None and stale_token != self.token:
             return
 
-        self.attempt_login = True
-        try:
-            data = await self.postJson(
-                '/Users/AuthenticateByName',
-                data={
-                    'Username': self.username,
-                    'Pw': self.password,
-                },
-                send_raw=True,
-                format='json',
-            )
+        if _logging_in.get():
+            # requests made by the login itself (also from tasks it
+            # started, e.g. to apply a deadline or hedge)
+            return
 
-            self.token = data.get('AccessToken', '')
-            self.userid = data.get('User', {}).get('Id')
-            self.api_key = self.token
+        loop = asyncio.get_running_loop()
+        task = self._login_tasks.get(loop)
+        if task is None:
+            task = self._share_task(self._login_tasks, loop, self._login())
+        await asyncio.shield(task)
+
+    async def _login(self):
+        # runs in its own task - shared by every waiting request, so it
+        # is not bound to the deadline of the one that started it
+        _logging_in.set(True)
+        deadline.clear()
+        data = await self.postJson(
+            '/Users/AuthenticateByName',
+            data={
+                'Username': self.username,
+                'Pw': self.password,
+            },
+            send_raw=True,
+            format='json',
+        )
 
-            session = await self._get_session()
-            auth_header = session._default_headers['X-Emby-Authorization']
-            auth_header += f',Token="{self.token}"'
-            session._default_headers['X-MediaBrowser-Token'] = self.token
-            session._default_headers['Authorization'] = auth_header
-            session._default_headers['X-Emby-Authorization'] = auth_header
-            await self._end_session()
-        finally:
-            self.attempt_login = False
+        self.token = data.get('AccessToken', '')
+        self.userid = data.get('User', {}).get('Id')
+        self.api_key = self.token
+
+        session = await self._get_session()
+        session._default_headers.update(self._auth_headers())
+        await self._end_session()
+
+        if self.token_file and self.token:
+            self._save_token()
 
     def get_url(
         self, path='/', websocket=False, remote=True,
@@ -338,9 +588,9 @@ class Connector:
         return url[:-1] if url[-1] == '?' else url
 
     @async_func
-    async def _process_resp(self, resp):
+    async def _process_resp(self, resp, token=None):
         if (not resp or resp.status == 401) and self.username:
-            await self.login()
+            await self.login(token)
             return False
         if not resp:
             return False
@@ -351,9 +601,9 @@ class Connector:
 
     @staticmethod
     @async_func
-    async def resp_to_json(resp):
+    async def resp_to_json(resp, loads=json_loads):
         try:
-            return await resp.json()
+            return await resp.json(loads=loads)
         except aiohttp.client_exceptions.ContentTypeError:
             raise RuntimeError(
                 'Unexpected JSON output (status: {}): "{}"'.format(
@@ -371,9 +621,11 @@ class Connector:
         await self.login_if_needed()
         for i in range(self.tries):
             url = self.get_url(path, **query)
+            token = self.token
             try:
-                resp = await method(url, timeout=self.timeout, **params)
-                if await self._process_resp(resp):
+                async with self._request_limit():
+                    resp = await method(url, timeout=self.timeout, **params)
+                if await self._process_resp(resp, token):
                     return resp
                 await asyncio.sleep(random.random()*i + 0.2)
             except asyncio.exceptions.TimeoutError:
@@ -405,6 +657,9 @@ class Connector:
         requests.models.Response
           the response that was given
         '''
+        return await self._bounded(self._hedged(self._get, path, **query))
+
+    async def _get(self, path, **query):
         try:
             session = await self._get_session()
             async with await self._req(
@@ -436,6 +691,9 @@ class Connector:
         requests.models.Response
           the response that was given
         '''
+        return await self._bounded(self._delete(path, **query))
+
+    async def _delete(self, path, **query):
         try:
             session = await self._get_session()
             async with await self._req(
@@ -472,13 +730,13 @@ class Connector:
         requests.models.Response
           the response that was given
         '''
-        return await self._post(
+        return await self._bounded(self._post(
             path,
             return_json=False,
             data=data,
             send_raw=send_raw,
             **query,
-        )
+        ))
 
     @async_func
     async def postJson(self, path, data={}, send_raw=False, **query):
@@ -505,13 +763,13 @@ class Connector:
         requests.models.Response
           the response that was given
         '''
-        return await self._post(
+        return await self._bounded(self._post(
             path,
             return_json=True,
             data=data,
             send_raw=send_raw,
             **query,
-        )
+        ))
 
     @async_func
     async def _post(self, path, return_json, data, send_raw, **query):
@@ -572,7 +830,17 @@ class Connector:
         -------
         dict
           the response content as a dict
+
+        Notes
+        -----
+        With `hedge=True`, a request slower than usual for its path is
+        sent a second time, and the first answer is returned.
         '''
+        return await self._bounded(
+            self._hedged(self._get_json, path, **query)
+        )
+
+    async def _get_json(self, path, **query):
         try:
             session = await self._get_session()
             async with await self._req(
@@ -580,6 +848,6 @@ class Connector:
                 path,
                 **query
             ) as resp:
-                return await Connector.resp_to_json(resp)
+                return await Connector.resp_to_json(resp, self.loads)
         finally:
             await self._end_session()
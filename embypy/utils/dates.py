@@ -0,0 +1,64 @@
+import datetime
+
+import arrow
+
+_UTC = datetime.timezone.utc
+_DIGITS = frozenset('0123456789')
+
+
+def parse_datetime(ts):
+    '''parse an emby/jellyfin timestamp into an aware datetime
+
+    Handles the formats the servers send, such as
+    `2019-05-03T00:00:00.0000000Z` or `2019-05-03T00:00:00+02:00`,
+    without going through arrow's generic parser. Anything else is
+    handed to `arrow.get`.
+
+    Parameters
+    ----------
+    ts : str
+      the timestamp
+
+    Returns
+    -------
+    datetime.datetime
+      timezone aware (UTC unless an offset is given)
+    '''
+    try:
+        if len(ts) < 19 or ts[4] != '-' or ts[7] != '-' or \
+           ts[10] not in 'T ' or ts[13] != ':' or ts[16] != ':':
+            raise ValueError
+
+        pos = 19
+        micro = 0
+        if len(ts) > pos and ts[pos] == '.':
+            end = pos + 1
+            while end < len(ts) and ts[end] in _DIGITS:
+                end += 1
+            # emby sends 7 digits, round to 6 (half to even, like arrow)
+            digits = ts[pos+1:end].ljust(7, '0')
+            micro = int(digits[:6])
+            if digits[6] > '5' or (digits[6] == '5' and micro % 2):
+                micro += 1
+            pos = end
+
+        rest = ts[pos:]
+        if rest in ('', 'Z', 'z'):
+            tz = _UTC
+        elif len(rest) == 6 and rest[0] in '+-' and rest[3] == ':':
+            offset = datetime.timedelta(
+                hours=int(rest[1:3]), minutes=int(rest[4:6])
+            )
+            tz = datetime.timezone(-offset if rest[0] == '-' else offset)
+        else:
+            raise ValueError
+
+        carry = micro // 1000000
+        parsed = datetime.datetime(
+            int(ts[0:4]), int(ts[5:7]), int(ts[8:10]),
+            int(ts[11:13]), int(ts[14:16]), int(ts[17:19]),
+            micro % 1000000, tz,
+        )
+        return parsed + datetime.timedelta(seconds=1) if carry else parsed
+    except ValueError:
+        return arrow.get(ts).datetime
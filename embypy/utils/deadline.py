@@ -0,0 +1,101 @@
+import asyncio
+import contextvars
+import time
+
+_current = contextvars.ContextVar('embypy_deadline', default=None)
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    '''raised by requests sent after (or running past) a deadline'''
+
+
+class Deadline:
+    '''Time budget for everything done inside a `with` block
+
+    Every request sent inside the block (also from tasks started in it)
+    gets the remaining time as its timeout and is cancelled when the
+    deadline passes, raising `DeadlineExceeded`.
+    Works with `with` and `async with`, nested deadlines can only
+    shorten the outer one.
+
+    Parameters
+    ----------
+    seconds : float
+      the time budget
+    partial : bool, optional
+      paged listings (e.g. `Emby.movies_force`, `Folder.items`) return
+      what they got so far instead of raising (default False)
+
+    Attributes
+    ----------
+    expired : bool
+      whether a result was cut short by the deadline
+
+    Examples
+    --------
+    >>> with Deadline(5, partial=True) as deadline:
+    ...     movies = emby.movies_force
+    >>> deadline.expired
+    False
+    '''
+    def __init__(self, seconds, partial=False):
+        self.seconds	= seconds
+        self.partial	= partial
+        self.expired	= False
+        self.at		= None
+        self._token	= None
+
+    def remaining(self):
+        '''seconds left (0 once passed)'''
+        return max(0.0, self.at - time.monotonic())
+
+    def __enter__(self):
+        self.at = time.monotonic() + self.seconds
+        parent = _current.get()
+        if parent is not None:
+            self.at = min(self.at, parent.at)
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, *exc):
+        _current.reset(self._token)
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, *exc):
+        return self.__exit__(*exc)
+
+
+def remaining():
+    '''seconds left of the current deadline (None - no deadline)'''
+    deadline = _current.get()
+    return None if deadline is None else deadline.remaining()
+
+
+def clear():
+    '''drop the deadline for the rest of the current task
+
+    For tasks shared by several callers (e.g. the login), which should
+    not fail because the caller that started them is out of time.
+    '''
+    _current.set(None)
+
+
+def accept_partial():
+    '''whether a listing cut short by the deadline may return what it has
+
+    Marks the current deadline as expired when it does.
+    '''
+    deadline = _current.get()
+    if deadline is None or not deadline.partial:
+        return False
+    deadline.expired = True
+    return True
+
+
+def expired():
+    '''whether a result of the current deadline was cut short'''
+    deadline = _current.get()
+    return deadline is not None and deadline.expired
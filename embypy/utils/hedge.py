@@ -0,0 +1,162 @@
+import asyncio
+import re
+import time
+from collections import OrderedDict, deque
+
+# path segments that are ids (hex/guid item ids, numbers)
+_ID_SEGMENT = re.compile(
+    r'^(?:[0-9a-f]{32}|[0-9a-f]{8}(?:-[0-9a-f]{4}){3}-[0-9a-f]{12}|\d+)$',
+    re.IGNORECASE,
+)
+
+
+def route(path):
+    '''path with id segments replaced, e.g. `/Items/{id}/Images`'''
+    return '/' + '/'.join(
+        '{id}' if _ID_SEGMENT.match(part) else part
+        for part in path.split('/') if part
+    )
+
+
+class Hedger:
+    '''Races a duplicate of slow requests against the original
+
+    If a request has not answered within the `percentile` latency of
+    recent requests to the same route (path without ids), the request is
+    sent again and whichever answers first is used (the other one is
+    cancelled).
+
+    Parameters
+    ----------
+    percentile : float, optional
+      latency percentile after which a request is hedged (default 0.95)
+    budget : float, optional
+      max number of hedges per request, on average (default 0.05)
+    min_delay : float, optional
+      seconds to wait at least before hedging (default 0.05)
+    window : int, optional
+      number of recent latencies kept per route (default 200)
+    min_samples : int, optional
+      latencies needed before a route is hedged (default 20)
+    max_routes : int, optional
+      number of routes (paths without ids) latencies are kept for,
+      the least recently used are dropped (default 256)
+
+    Notes
+    -----
+    Only meant for idempotent requests. Used internally by
+    `embypy.utils.Connector` when created with `hedge=True`.
+    '''
+    # hedges that may be saved up while requests are fast
+    max_tokens = 10
+
+    def __init__(
+        self, percentile=0.95, budget=0.05, min_delay=0.05, window=200,
+        min_samples=20, max_routes=256,
+    ):
+        self.percentile	= percentile
+        self.budget	= budget
+        self.min_delay	= min_delay
+        self.window	= window
+        self.min_samples	= min_samples
+        self.max_routes	= max_routes
+        self._latencies	= OrderedDict()
+        self._tokens	= 0.0
+        self.requests	= 0
+        self.hedged	= 0
+        self.hedge_wins	= 0
+        self.skipped	= 0
+
+    def record(self, key, latency):
+        '''add the latency of a successful request'''
+        key = route(key)
+        latencies = self._latencies.get(key)
+        if latencies is None:
+            latencies = self._latencies[key] = deque(maxlen=self.window)
+            while len(self._latencies) > self.max_routes:
+                self._latencies.popitem(last=False)
+        else:
+            self._latencies.move_to_end(key)
+        latencies.append(latency)
+
+    def delay(self, key):
+        '''seconds to wait before hedging a request (None - never)'''
+        latencies = self._latencies.get(route(key))
+        if not latencies or len(latencies) < self.min_samples:
+            return None
+        ordered = sorted(latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile))
+        return max(self.min_delay, ordered[index])
+
+    def _take_token(self):
+        if self._tokens < 1:
+            self.skipped += 1
+            return False
+        self._tokens -= 1
+        return True
+
+    def stats(self):
+        '''counters of the hedging so far
+
+        Returns
+        -------
+        dict
+          `requests`, `hedged` (duplicates sent), `hedge_wins` (the
+          duplicate answered first), `skipped` (slow, but over budget)
+          and `win_rate` (`hedge_wins / hedged`)
+        '''
+        win_rate = self.hedge_wins / self.hedged if self.hedged else 0.0
+        return {
+            'requests':		self.requests,
+            'hedged':		self.hedged,
+            'hedge_wins':	self.hedge_wins,
+            'skipped':		self.skipped,
+            'win_rate':		win_rate,
+        }
+
+    async def _timed(self, key, request):
+        start = time.monotonic()
+        result = await request()
+        self.record(key, time.monotonic() - start)
+        return result
+
+    async def run(self, key, request):
+        '''await `request()`, hedged with a second `request()` if slow
+
+        Parameters
+        ----------
+        key : str
+          groups requests with similar latency - the path, ids in it
+          are ignored (see `route`)
+        request : callable
+          returns a new awaitable for every call
+        '''
+        self.requests += 1
+        self._tokens = min(self.max_tokens, self._tokens + self.budget)
+        delay = self.delay(key)
+        primary = asyncio.ensure_future(self._timed(key, request))
+        pending = {primary}
+        try:
+            if delay is None:
+                return await primary
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if done or not self._take_token():
+                return await primary
+
+            self.hedged += 1
+            pending.add(asyncio.ensure_future(self._timed(key, request)))
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
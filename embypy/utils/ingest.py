@@ -0,0 +1,114 @@
+import sys
+
+# top level fields whose (string) values repeat across many items
+INTERN_FIELDS = (
+    'Type', 'MediaType', 'CollectionType', 'LocationType',
+    'SeriesName', 'SeasonName', 'Album', 'AlbumArtist', 'OfficialRating',
+    'Container', 'VideoType', 'ServerId', 'ChannelId', 'Status',
+    'ParentId', 'SeriesId', 'SeasonId', 'AlbumId', 'PresentationUniqueKey',
+)
+
+# fields holding lists of strings
+INTERN_LIST_FIELDS = ('Genres', 'SeriesGenres', 'Tags', 'Artists', 'AirDays')
+
+# fields holding lists of {'Name': .., 'Id': ..} dicts
+INTERN_ITEM_FIELDS = (
+    'Studios', 'GenreItems', 'TagItems', 'ArtistItems', 'AlbumArtists',
+)
+
+# id fields that can be stored as 16 bytes instead of a 32 char string
+ID_FIELDS = ('Id', 'ItemId', 'ParentId', 'SeriesId', 'SeasonId', 'AlbumId')
+
+
+def compact_id(value):
+    '''convert a 32 character hex id to 16 bytes (other values unchanged)'''
+    if type(value) == str and len(value) == 32:
+        try:
+            return bytes.fromhex(value)
+        except ValueError:
+            pass
+    return value
+
+
+def expand_id(value):
+    '''reverse of `compact_id`'''
+    if type(value) == bytes:
+        return value.hex()
+    return value
+
+
+def expand_ids(object_dict):
+    '''copy of an item dict with every compacted id turned back into a str'''
+    if not any(type(object_dict.get(key)) == bytes for key in ID_FIELDS):
+        return object_dict
+    return {
+        key: expand_id(value) if key in ID_FIELDS else value
+        for key, value in object_dict.items()
+    }
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) == str else value
+
+
+class Ingester:
+    '''Shrinks item dicts before they are cached
+
+    Parameters
+    ----------
+    intern : bool, optional
+      intern frequently repeated values (default True)
+    prune_fields : iterable, optional
+      keys to drop from every item, e.g. `('MediaSources', 'MediaStreams')`
+    compact_ids : bool, optional
+      store hex ids as 16 byte values (default False)
+
+    Notes
+    -----
+    Applied by `EmbyObject.process` to every item dict it receives.
+    Dicts are changed in place, values that are already compact (ids
+    stored as bytes, non-str values) are left alone. Keys are not
+    interned, the json decoders already share one key string per
+    response.
+    '''
+    def __init__(self, intern=True, prune_fields=(), compact_ids=False):
+        self.intern		= intern
+        self.prune_fields	= frozenset(prune_fields or ())
+        self.compact_ids	= compact_ids
+        # ids are compacted instead of interned
+        self._intern_fields	= tuple(
+            key for key in INTERN_FIELDS
+            if not (compact_ids and key in ID_FIELDS)
+        )
+
+    def __call__(self, object_dict):
+        if type(object_dict) != dict:
+            # typed items (`embypy.utils.schema.Item`) are already compact
+            return object_dict
+
+        for key in self.prune_fields:
+            object_dict.pop(key, None)
+
+        if self.intern:
+            for key in self._intern_fields:
+                value = object_dict.get(key)
+                if type(value) == str:
+                    object_dict[key] = sys.intern(value)
+            for key in INTERN_LIST_FIELDS:
+                values = object_dict.get(key)
+                if type(values) == list:
+                    values[:] = map(_intern, values)
+            for key in INTERN_ITEM_FIELDS:
+                for entry in object_dict.get(key) or ():
+                    if type(entry) == dict:
+                        for field in ('Name', 'Id'):
+                            if field in entry:
+                                entry[field] = _intern(entry[field])
+
+        if self.compact_ids:
+            for key in ID_FIELDS:
+                value = object_dict.get(key)
+                if type(value) == str:
+                    object_dict[key] = compact_id(value)
+
+        return object_dict
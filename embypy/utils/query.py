@@ -0,0 +1,211 @@
+from embypy.utils.asyncio import async_func
+
+
+class ItemQuery:
+    '''Composable filter for the server's Items endpoint
+
+    Every method returns a new query, so partial queries can be reused.
+    Filters are sent to the server, only matching items are transferred.
+
+    Parameters
+    ----------
+    emby : embypy.Emby
+      the connection to query through
+    types : iterable
+      item types to include (e.g. `['Movie']`), empty for all types
+
+    Examples
+    --------
+    >>> query = emby.query('Movie').genres('Science Fiction') \\
+    ...     .years(2019).min_rating(7)
+    >>> await query.count()
+    >>> movies = await query.all()
+    >>> async for movie in query.stream():
+    ...     ...
+
+    See Also
+    --------
+      embypy.Emby.query :
+    '''
+    def __init__(self, emby, types=(), params=None, extra_fields='',
+                 sort='SortName', limit=200):
+        self._emby		= emby
+        self._types		= tuple(types)
+        self._params		= dict(params or {})
+        self._extra_fields	= extra_fields
+        self._sort		= sort
+        self._limit		= limit
+
+    def __repr__(self):
+        return '<ItemQuery {} {}>'.format(
+            ','.join(self._types) or '*', self._params
+        )
+
+    def _copy(self, **changes):
+        query = ItemQuery(
+            self._emby, self._types, self._params,
+            self._extra_fields, self._sort, self._limit,
+        )
+        for key, value in changes.items():
+            setattr(query, '_' + key, value)
+        return query
+
+    def where(self, **params):
+        '''add raw Items endpoint parameters (e.g. `IsHD=True`)'''
+        return self._copy(params={**self._params, **params})
+
+    def types(self, *types):
+        '''only include items of these types'''
+        return self._copy(types=self._types + types)
+
+    def genres(self, *genres):
+        '''only include items in any of these genres'''
+        return self.where(Genres='|'.join(genres))
+
+    def tags(self, *tags):
+        '''only include items with any of these tags'''
+        return self.where(Tags='|'.join(tags))
+
+    def studios(self, *studios):
+        '''only include items from any of these studios'''
+        return self.where(Studios='|'.join(studios))
+
+    def years(self, *years):
+        '''only include items from these production years'''
+        return self.where(Years=','.join(map(str, years)))
+
+    def min_rating(self, rating):
+        '''only include items with at least this community rating'''
+        return self.where(MinCommunityRating=rating)
+
+    def min_critic_rating(self, rating):
+        '''only include items with at least this critic rating'''
+        return self.where(MinCriticRating=rating)
+
+    def parent(self, parent_id):
+        '''only include items under this folder/library (by id)'''
+        return self.where(ParentId=parent_id)
+
+    def played(self, value=True):
+        '''only include (un)played items'''
+        return self.where(IsPlayed=str(bool(value)).lower())
+
+    def favorite(self, value=True):
+        '''only include items that are (not) favorites'''
+        return self.where(IsFavorite=str(bool(value)).lower())
+
+    def name_starts_with(self, prefix):
+        '''only include items whose sort name starts with `prefix`'''
+        return self.where(NameStartsWith=prefix)
+
+    def name_range(self, start=None, end=None):
+        '''only include items with `start <= sort name < end`'''
+        params = {}
+        if start:
+            params['NameStartsWithOrGreater'] = start
+        if end:
+            params['NameLessThan'] = end
+        return self.where(**params)
+
+    def provider_id(self, provider, provider_id):
+        '''only include items with this provider id (e.g. `'Tmdb', 603`)'''
+        return self.where(
+            AnyProviderIdEquals='{}.{}'.format(provider.lower(), provider_id)
+        )
+
+    def as_user(self, user_id):
+        '''list items (and their play state) as another user'''
+        return self.where(userId=user_id)
+
+    def fields(self, *fields):
+        '''request extra fields (beyond path/overview/dates)'''
+        extra = ','.join(filter(None, (self._extra_fields,) + fields))
+        return self._copy(extra_fields=extra)
+
+    def sort(self, sort_by):
+        '''sort by other fields than `SortName` (comma separated)'''
+        return self._copy(sort=sort_by)
+
+    def page_size(self, limit):
+        '''number of items fetched per request while streaming'''
+        return self._copy(limit=limit)
+
+    @property
+    def _type_str(self):
+        return ','.join(self._types)
+
+    @async_func
+    async def count(self):
+        '''number of matching items, without fetching them
+
+        |coro|
+        '''
+        return await self._emby._count(self._type_str, **self._params)
+
+    @async_func
+    async def page(self, start=0, size=None):
+        '''one page of matching items
+
+        |coro|
+
+        Parameters
+        ----------
+        start : int
+          index of the first item
+        size : int, optional
+          number of items, defaults to the query's `page_size`
+
+        Returns
+        -------
+        list
+          of :class:`embypy.objects.EmbyObject`
+        '''
+        resp = await self._emby._get_page(
+            self._type_str,
+            fields	= self._emby._list_fields(self._extra_fields),
+            start	= start,
+            limit	= size or self._limit,
+            sort	= self._sort,
+            count	= False,
+            **self._params
+        )
+        return await self._emby.process(
+            resp['Items'], self._params.get('userId')
+        )
+
+    @async_func
+    async def stream(self, start=0, stop=None):
+        '''iterate over matching items, fetching them page by page
+
+        |coro|
+
+        Parameters
+        ----------
+        start : int, optional
+          index of the first item
+        stop : int, optional
+          index to stop at (default - all items)
+
+        Yields
+        ------
+        :class:`embypy.objects.EmbyObject`
+        '''
+        async for page in self._emby._iter_list(
+            self._type_str,
+            extra_fields	= self._extra_fields,
+            limit		= self._limit,
+            start		= start,
+            stop		= stop,
+            sort		= self._sort,
+            **self._params
+        ):
+            for item in page:
+                yield item
+
+    @async_func
+    async def all(self):
+        '''list of all matching items
+
+        |coro|
+        '''
+        return [item async for item in self.stream()]
@@ -0,0 +1,321 @@
+import json
+from typing import Any, Union
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+def json_loads(data):
+    '''decode json, using msgspec if it is installed
+
+    Parameters
+    ----------
+    data : str, bytes
+      json document
+
+    Returns
+    -------
+    the decoded value (dicts/lists/...)
+    '''
+    if msgspec is not None:
+        return msgspec.json.decode(data)
+    return json.loads(data)
+
+
+def _require_msgspec():
+    if msgspec is None:
+        raise ImportError(
+            'msgspec is required for typed decoding (pip install msgspec)'
+        )
+
+
+if msgspec is not None:
+    UNSET = msgspec.UNSET
+
+    def _opt(kind):
+        return Union[kind, None, msgspec.UnsetType]
+
+    class Item(
+        msgspec.Struct, tag_field='Type', rename='pascal', gc=False,
+    ):
+        '''Typed fields of an item, plus the rest of its json undecoded
+
+        The fields the object properties, indexes and search read are
+        decoded (and type checked) when the response is decoded, every
+        other key stays json until it is used, e.g. by `send`.
+        Behaves like the item dict (`get`, `[]`, `in`, `items`, ...),
+        so it can be used as `EmbyObject.object_dict`.
+        '''
+        id:			_opt(str) = UNSET
+        item_id:		_opt(str) = UNSET
+        name:			_opt(str) = UNSET
+        original_title:		_opt(str) = UNSET
+        sort_name:		_opt(str) = UNSET
+        overview:		_opt(str) = UNSET
+        path:			_opt(str) = UNSET
+        parent_id:		_opt(str) = UNSET
+        media_type:		_opt(str) = UNSET
+        premiere_date:		_opt(str) = UNSET
+        date_created:		_opt(str) = UNSET
+        production_year:	_opt(int) = UNSET
+        run_time_ticks:		_opt(int) = UNSET
+        community_rating:	_opt(float) = UNSET
+        critic_rating:		_opt(float) = UNSET
+        official_rating:	_opt(str) = UNSET
+        index_number:		_opt(int) = UNSET
+        parent_index_number:	_opt(int) = UNSET
+        child_count:		_opt(int) = UNSET
+        genres:			_opt(list[str]) = UNSET
+        tags:			_opt(list[str]) = UNSET
+        studios:		_opt(list[dict[str, Any]]) = UNSET
+        provider_ids:		_opt(dict[str, _opt(str)]) = UNSET
+        user_data:		_opt(dict[str, Any]) = UNSET
+        series_id:		_opt(str) = UNSET
+        series_name:		_opt(str) = UNSET
+        season_id:		_opt(str) = UNSET
+        season_name:		_opt(str) = UNSET
+        album_id:		_opt(str) = UNSET
+        album:			_opt(str) = UNSET
+        album_artist:		_opt(str) = UNSET
+        artists:		_opt(list[str]) = UNSET
+        # json of the item (oldest first), decoded into `_extra` on use
+        _raw:			Any = None
+        _extra:			Any = None
+
+        def _full(self):
+            # the untyped keys, decoded from the json on first use
+            if self._extra is None:
+                extra = {}
+                for raw in self._raw or ():
+                    extra.update(msgspec.json.decode(raw))
+                for key in (*self._keys, 'Type'):
+                    extra.pop(key, None)
+                self._extra, self._raw = extra, None
+            return self._extra
+
+        def _absorb(self, other):
+            # merge a newer copy of the item, without decoding its json
+            for key, field in other._keys.items():
+                value = getattr(other, field)
+                if value is not UNSET:
+                    setattr(self, field, value)
+            if other._extra is not None:
+                self._full().update(other._extra)
+            elif other._raw:
+                if self._extra is None and len(self._raw or ()) < 4:
+                    if not self._raw or self._raw[-1] != other._raw[-1]:
+                        self._raw = (*(self._raw or ()), *other._raw)
+                else:
+                    extra = self._full()
+                    extra.update(other._full())
+
+        def get(self, key, default=None):
+            field = self._keys.get(key)
+            if field is not None:
+                value = getattr(self, field)
+                return default if value is UNSET else value
+            if key == 'Type':
+                return self.__struct_config__.tag
+            return self._full().get(key, default)
+
+        def __getitem__(self, key):
+            value = self.get(key, UNSET)
+            if value is UNSET:
+                raise KeyError(key)
+            return value
+
+        def __setitem__(self, key, value):
+            field = self._keys.get(key)
+            if field is not None:
+                setattr(self, field, value)
+            elif key == 'Type':
+                if value != self.__struct_config__.tag:
+                    raise ValueError('the type of typed items is fixed', key)
+            else:
+                self._full()[key] = value
+
+        def __delitem__(self, key):
+            field = self._keys.get(key)
+            if field is None:
+                del self._full()[key]
+            elif getattr(self, field) is UNSET:
+                raise KeyError(key)
+            else:
+                setattr(self, field, UNSET)
+
+        def __contains__(self, key):
+            return self.get(key, UNSET) is not UNSET
+
+        def keys(self):
+            return [
+                key for key, field in self._keys.items()
+                if getattr(self, field) is not UNSET
+            ] + ['Type', *self._full()]
+
+        def __iter__(self):
+            return iter(self.keys())
+
+        def __len__(self):
+            return len(self.keys())
+
+        def items(self):
+            return [(key, self[key]) for key in self.keys()]
+
+        def values(self):
+            return [self[key] for key in self.keys()]
+
+        def pop(self, key, *default):
+            value = self.get(key, UNSET)
+            if value is UNSET:
+                if default:
+                    return default[0]
+                raise KeyError(key)
+            del self[key]
+            return value
+
+        def setdefault(self, key, default=None):
+            value = self.get(key, UNSET)
+            if value is UNSET:
+                self[key] = value = default
+            return value
+
+        def update(self, other):
+            if type(other) == type(self):
+                self._absorb(other)
+                return
+            for key, value in other.items():
+                self[key] = value
+
+        def copy(self):
+            return dict(self.items())
+
+    class Video(Item, tag='Video'):
+        aspect_ratio:		_opt(str) = UNSET
+        chapters:		_opt(list[dict[str, Any]]) = UNSET
+
+    class Movie(Video, tag='Movie'):
+        pass
+
+    class Trailer(Video, tag='Trailer'):
+        pass
+
+    class AdultVideo(Video, tag='AdultVideo'):
+        pass
+
+    class Episode(Video, tag='Episode'):
+        series_genres:		_opt(list[str]) = UNSET
+
+    class MusicVideo(Video, tag='MusicVideo'):
+        artist_items:		_opt(list[dict[str, Any]]) = UNSET
+        album_artists:		_opt(list[dict[str, Any]]) = UNSET
+
+    class Audio(Item, tag='Audio'):
+        artist_items:		_opt(list[dict[str, Any]]) = UNSET
+        album_artists:		_opt(list[dict[str, Any]]) = UNSET
+
+    class Person(Item, tag='Person'):
+        role:			_opt(str) = UNSET
+
+    class Folder(Item, tag='Folder'):
+        cumulative_run_time_ticks:	_opt(int) = UNSET
+
+    class CollectionFolder(Folder, tag='CollectionFolder'):
+        pass
+
+    class Playlist(Folder, tag='Playlist'):
+        pass
+
+    class BoxSet(Folder, tag='BoxSet'):
+        pass
+
+    class MusicArtist(Folder, tag='MusicArtist'):
+        pass
+
+    class MusicAlbum(Folder, tag='MusicAlbum'):
+        artist_items:		_opt(list[dict[str, Any]]) = UNSET
+        album_artists:		_opt(list[dict[str, Any]]) = UNSET
+
+    class Season(Folder, tag='Season'):
+        pass
+
+    class Series(Folder, tag='Series'):
+        air_days:		_opt(list[str]) = UNSET
+        air_time:		_opt(str) = UNSET
+        status:			_opt(str) = UNSET
+
+    class GameSystem(Folder, tag='GameSystem'):
+        pass
+
+    # item types decoded into structs, other types stay dicts
+    ITEM_TYPES = (
+        Video, Movie, Trailer, AdultVideo, Episode, MusicVideo, Audio,
+        Person, Folder, CollectionFolder, Playlist, BoxSet, MusicArtist,
+        MusicAlbum, Season, Series, GameSystem,
+    )
+
+    for _type in ITEM_TYPES:
+        # json key -> field, for the typed keys
+        _type._keys = {
+            key: field for key, field in zip(
+                _type.__struct_encode_fields__, _type.__struct_fields__
+            ) if not field.startswith('_')
+        }
+
+    _item_decoder	= msgspec.json.Decoder(Union[ITEM_TYPES], strict=False)
+    _raw_list_decoder	= msgspec.json.Decoder(list[msgspec.Raw])
+    _document_decoder	= msgspec.json.Decoder(dict[str, msgspec.Raw])
+else:
+    Item = None
+    ITEM_TYPES = ()
+
+
+def decode_item(data):
+    '''decode the json of one item into a typed `Item`
+
+    Items of other types, or whose fields do not have the expected
+    types, are decoded into a plain dict instead.
+    '''
+    try:
+        item = _item_decoder.decode(data)
+    except msgspec.ValidationError:
+        return msgspec.json.decode(data)
+    item._raw = (bytes(data),)
+    return item
+
+
+def typed_loads(data):
+    '''decode json, with the items in `Items` lists typed
+
+    Every value of the json document is decoded once, items of the types
+    in `ITEM_TYPES` become `Item` structs (see `decode_item`), all other
+    values are decoded as usual.
+
+    Parameters
+    ----------
+    data : str, bytes
+      json document
+
+    Returns
+    -------
+    the decoded value (dicts/lists/...)
+    '''
+    _require_msgspec()
+    try:
+        document = _document_decoder.decode(data)
+    except msgspec.ValidationError:
+        # not an object
+        return msgspec.json.decode(data)
+    decoded = {}
+    for key, raw in document.items():
+        if key != 'Items':
+            decoded[key] = msgspec.json.decode(raw)
+            continue
+        try:
+            items = _raw_list_decoder.decode(raw)
+        except msgspec.ValidationError:
+            decoded[key] = msgspec.json.decode(raw)
+        else:
+            decoded[key] = [decode_item(item) for item in items]
+    return decoded
@@ -0,0 +1,211 @@
+import re
+import unicodedata
+
+_TOKEN = re.compile(r'\w+')
+
+# json keys that are indexed, with the weight of a match in each
+TEXT_FIELDS = {
+    'Name':		3,
+    'OriginalTitle':	2,
+    'SeriesName':	2,
+    'Album':		1,
+    'AlbumArtist':	1,
+    'Artists':		1,
+    'Tags':		1,
+}
+
+
+def normalize(text):
+    '''lowercase and strip accents'''
+    text = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(c for c in text if not unicodedata.combining(c))
+
+
+def tokenize(text):
+    '''split text into normalized words'''
+    return _TOKEN.findall(normalize(text))
+
+
+def trigrams(token):
+    '''set of 3 character substrings of a (padded) token'''
+    token = f' {token} '
+    return {token[i:i+3] for i in range(len(token) - 2)}
+
+
+class SearchIndex:
+    '''In memory token + trigram index over cached item names
+
+    Whole words and word prefixes are looked up through the token index,
+    misspelled words fall back to trigram similarity.
+
+    Notes
+    -----
+    Kept up to date by `ObjectCache`, which holds the lock.
+    Types that were listed completely (e.g. by `Emby.movies`) are
+    recorded in `complete_types`, so `Emby.search` knows which types
+    it can answer without asking the server.
+    '''
+    def __init__(self):
+        self._docs		= {}
+        self._tokens		= {}
+        self._prefixes		= {}
+        self._trigrams		= {}
+        self.complete_types	= set()
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _document(self, object_dict):
+        weights = {}
+        for field, weight in TEXT_FIELDS.items():
+            value = object_dict.get(field)
+            if not value:
+                continue
+            for text in value if type(value) == list else (value,):
+                if type(text) != str:
+                    continue
+                for token in tokenize(text):
+                    weights[token] = max(weights.get(token, 0), weight)
+        name = normalize(object_dict.get('Name') or '')
+        return object_dict.get('Type'), name, weights
+
+    def add(self, item_id, object_dict):
+        '''(re)index an item'''
+        self.remove(item_id)
+        doc = self._document(object_dict)
+        if not doc[2]:
+            return
+        self._docs[item_id] = doc
+        for token in doc[2]:
+            self._tokens.setdefault(token, set()).add(item_id)
+            for prefix in (token[:1], token[:2]):
+                self._prefixes.setdefault(prefix, set()).add(item_id)
+            for gram in trigrams(token):
+                self._trigrams.setdefault(gram, set()).add(item_id)
+
+    def remove(self, item_id):
+        '''drop an item from the index, returning its type (if indexed)'''
+        doc = self._docs.pop(item_id, None)
+        if doc is None:
+            return None
+        for token in doc[2]:
+            self._discard(self._tokens, token, item_id)
+            for prefix in (token[:1], token[:2]):
+                self._discard(self._prefixes, prefix, item_id)
+            for gram in trigrams(token):
+                self._discard(self._trigrams, gram, item_id)
+        return doc[0]
+
+    @staticmethod
+    def _discard(index, value, item_id):
+        ids = index.get(value)
+        if ids is not None:
+            ids.discard(item_id)
+            if not ids:
+                del index[value]
+
+    def mark_complete(self, types):
+        '''record that every item of these types is cached
+
+        Parameters
+        ----------
+        types : str, iterable
+          comma separated string or list of item types
+        '''
+        if isinstance(types, str):
+            types = types.split(',')
+        self.complete_types.update(t for t in types if t)
+
+    def _prefix_matches(self, token):
+        if len(token) < 3:
+            return set(self._prefixes.get(token, ()))
+        grams = sorted(
+            (self._trigrams.get(g, set()) for g in trigrams(token)
+             if not g.endswith(' ')),
+            key=len,
+        )
+        if not grams or not grams[0]:
+            return set()
+        ids = set.intersection(*grams)
+        return {
+            i for i in ids
+            if any(t.startswith(token) for t in self._docs[i][2])
+        }
+
+    def _fuzzy_matches(self, token):
+        grams = trigrams(token)
+        counts = {}
+        for gram in grams:
+            for item_id in self._trigrams.get(gram, ()):
+                counts[item_id] = counts.get(item_id, 0) + 1
+        needed = max(1, len(grams) // 3)
+        return {i for i, c in counts.items() if c >= needed}
+
+    def _score(self, item_id, tokens, query):
+        kind, name, weights = self._docs[item_id]
+        score = 0
+        if name == query:
+            score += 100
+        elif name.startswith(query):
+            score += 50
+        for token in tokens:
+            if token in weights:
+                score += 10 * weights[token]
+                continue
+            prefix = [w for t, w in weights.items() if t.startswith(token)]
+            if prefix:
+                score += 5 * max(prefix)
+                continue
+            # misspelled - score by trigram similarity of the closest word
+            grams = trigrams(token)
+            score += max(
+                4 * w * len(grams & trigrams(t)) / len(grams | trigrams(t))
+                for t, w in weights.items()
+            )
+        # shorter names are closer matches
+        return score - len(name) / 100
+
+    def search(self, query, types=None, limit=None):
+        '''ids of the items that best match a query
+
+        Parameters
+        ----------
+        query : str
+          search string, the last word is matched as a prefix
+        types : iterable, optional
+          only include items of these types
+        limit : int, optional
+          max number of results
+
+        Returns
+        -------
+        list
+          ids, best match first
+        '''
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        candidates = None
+        for i, token in enumerate(tokens):
+            if i == len(tokens) - 1:
+                ids = self._prefix_matches(token)
+            else:
+                ids = set(self._tokens.get(token, ()))
+            if not ids:
+                ids = self._fuzzy_matches(token)
+            candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                return []
+
+        if types is not None:
+            types = set(types)
+            candidates = {i for i in candidates if self._docs[i][0] in types}
+
+        query = normalize(query.strip())
+        ranked = sorted(
+            candidates,
+            key=lambda i: self._score(i, tokens, query),
+            reverse=True,
+        )
+        return ranked[:limit] if limit else ranked
@@ -0,0 +1,230 @@
+from embypy.utils.ingest import expand_id
+from embypy.utils.userdata import USER_DATA_FIELDS
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+# json key -> numpy dtype, missing values are 0 (or NaN for floats)
+NUMERIC_COLUMNS = {
+    'RunTimeTicks':		'int64',
+    'CommunityRating':		'float64',
+    'CriticRating':		'float64',
+    'ProductionYear':		'int64',
+    'IndexNumber':		'int64',
+    'ParentIndexNumber':	'int64',
+}
+
+# UserData key -> numpy dtype
+USER_DATA_COLUMNS = {
+    'PlayCount':		'int64',
+    'PlaybackPositionTicks':	'int64',
+    'Played':			'bool',
+    'IsFavorite':		'bool',
+}
+
+# stored as int64 seconds since the epoch, missing = NaT
+DATE_COLUMNS = ('PremiereDate', 'DateCreated')
+
+# stored as dictionary encoded int32 codes, missing = -1
+CATEGORICAL_COLUMNS = (
+    'Type', 'MediaType', 'OfficialRating', 'SeriesName',
+    'ParentId', 'SeriesId', 'AlbumId',
+)
+
+_NAT = -2**63
+
+
+def _require_numpy():
+    if numpy is None:
+        raise ImportError('numpy is required for tables (pip install numpy)')
+
+
+class LibraryTable:
+    '''Struct-of-arrays view of a list of emby objects
+
+    Parameters
+    ----------
+    ids : numpy.ndarray
+      emby ids, one per row
+    columns : dict
+      column name -> numpy array
+    categories : dict
+      column name -> list of values for dictionary encoded columns,
+      `columns[name]` holds the index into this list (-1 if missing)
+
+    Notes
+    -----
+    Build with `LibraryTable.from_objects` or `embypy.Emby.table`.
+    Numeric columns are copies, changes to the objects afterwards
+    are not reflected.
+    '''
+    def __init__(self, ids, columns, categories):
+        self.ids	= ids
+        self.columns	= columns
+        self.categories	= categories
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    @classmethod
+    def from_objects(cls, objects, user_id=None):
+        '''build a table from a list of objects
+
+        Parameters
+        ----------
+        objects : array_like
+          list of :class:`embypy.objects.EmbyObject`
+        user_id : str, optional
+          whose play state fills the UserData columns
+          (default - the connector's user)
+
+        Returns
+        -------
+        LibraryTable
+        '''
+        _require_numpy()
+        count = len(objects)
+        columns = {}
+
+        for key, dtype in NUMERIC_COLUMNS.items():
+            missing = float('nan') if dtype == 'float64' else 0
+            columns[key] = numpy.fromiter(
+                (obj.object_dict.get(key) or missing for obj in objects),
+                dtype=dtype, count=count,
+            )
+
+        user_data = [obj.user_data(user_id) for obj in objects]
+        for key, dtype in USER_DATA_COLUMNS.items():
+            field = USER_DATA_FIELDS[key]
+            columns[key] = numpy.fromiter(
+                (getattr(data, field) for data in user_data),
+                dtype=dtype, count=count,
+            )
+
+        for key in DATE_COLUMNS:
+            dates = (obj._get_date(key) for obj in objects)
+            columns[key] = numpy.fromiter(
+                (int(d.timestamp()) if d else _NAT for d in dates),
+                dtype='int64', count=count,
+            )
+
+        categories = {}
+        for key in CATEGORICAL_COLUMNS:
+            lookup = {}
+            codes = numpy.empty(count, dtype='int32')
+            for i, obj in enumerate(objects):
+                value = obj.object_dict.get(key)
+                if value is None:
+                    codes[i] = -1
+                else:
+                    codes[i] = lookup.setdefault(value, len(lookup))
+            columns[key] = codes
+            categories[key] = [expand_id(value) for value in lookup]
+
+        ids = numpy.array([obj.id for obj in objects], dtype=object)
+        return cls(ids, columns, categories)
+
+    def dates(self, column='PremiereDate'):
+        '''date column as a `datetime64[s]` array (missing values are NaT)'''
+        return self.columns[column].view('datetime64[s]')
+
+    def decode(self, column):
+        '''values of a dictionary encoded column (None where missing)'''
+        values = self.categories[column]
+        return [values[c] if c >= 0 else None for c in self.columns[column]]
+
+    def mask(self, column, value):
+        '''boolean array of rows where a categorical column equals value'''
+        try:
+            code = self.categories[column].index(value)
+        except ValueError:
+            return numpy.zeros(len(self), dtype=bool)
+        return self.columns[column] == code
+
+    def total_runtime(self, where=None):
+        '''summed run time in seconds (of rows where `where` is true)'''
+        ticks = self.columns['RunTimeTicks']
+        if where is not None:
+            ticks = ticks[where]
+        return int(ticks.sum()) / (10**7)
+
+    def watch_ratio(self, where=None):
+        '''per row played ratio [0,1], same as `percentage_played`'''
+        played = self.columns['PlaybackPositionTicks']
+        total = self.columns['RunTimeTicks']
+        total = numpy.where(total > 0, total, numpy.maximum(played, 1))
+        ratio = played / total
+        return ratio if where is None else ratio[where]
+
+    def group_sum(self, column, by):
+        '''sum of a numeric column per value of a categorical column
+
+        Returns
+        -------
+        dict
+          category value -> sum
+        '''
+        codes = self.columns[by]
+        valid = codes >= 0
+        sums = numpy.bincount(
+            codes[valid],
+            weights=numpy.nan_to_num(self.columns[column][valid]),
+            minlength=len(self.categories[by]),
+        )
+        return dict(zip(self.categories[by], sums.tolist()))
+
+    def date_histogram(self, column='PremiereDate', unit='Y'):
+        '''count rows per year/month/day of a date column
+
+        Parameters
+        ----------
+        column : str
+          `'PremiereDate'` or `'DateCreated'`
+        unit : str
+          numpy datetime unit to bucket by, `'Y'`, `'M'`, `'D'`, ...
+
+        Returns
+        -------
+        tuple
+          (`datetime64` array of buckets, array of counts)
+        '''
+        dates = self.dates(column)
+        dates = dates[~numpy.isnat(dates)].astype(f'datetime64[{unit}]')
+        return numpy.unique(dates, return_counts=True)
+
+    def to_arrow(self):
+        '''convert to a `pyarrow.Table` (categorical columns as dictionaries)
+        '''
+        if pyarrow is None:
+            raise ImportError('pyarrow is required (pip install pyarrow)')
+        arrays = {'Id': pyarrow.array(self.ids.tolist(), pyarrow.string())}
+        for name, values in self.columns.items():
+            if name in self.categories:
+                arrays[name] = pyarrow.DictionaryArray.from_arrays(
+                    pyarrow.array(values, mask=values < 0),
+                    pyarrow.array(self.categories[name], pyarrow.string()),
+                )
+            elif name in DATE_COLUMNS:
+                arrays[name] = pyarrow.array(
+                    values, pyarrow.timestamp('s', tz='UTC'),
+                    mask=values == _NAT,
+                )
+            else:
+                arrays[name] = pyarrow.array(values)
+        return pyarrow.table(arrays)
+
+    def to_parquet(self, path, **kargs):
+        '''write the table to a parquet file (requires pyarrow)'''
+        pyarrow.parquet.write_table(self.to_arrow(), path, **kargs)
@@ -0,0 +1,94 @@
+import sys
+from collections import namedtuple
+
+# UserData json key -> field of `UserData`
+USER_DATA_FIELDS = {
+    'Played':			'played',
+    'PlayCount':		'play_count',
+    'PlaybackPositionTicks':	'position_ticks',
+    'IsFavorite':		'favorite',
+    'LastPlayedDate':		'last_played',
+}
+
+UserData = namedtuple('UserData', list(USER_DATA_FIELDS.values()))
+UserData.__doc__ = '''one user's play state of an item'''
+
+EMPTY_USER_DATA = UserData(False, 0, 0, False, None)
+
+
+class UserDataStore:
+    '''Per user play state, kept apart from the shared item dicts
+
+    Items are cached once per connector, the `UserData` emby sends with
+    them is stored here keyed by (user, item), so several users can be
+    served from the same cache.
+
+    Notes
+    -----
+    Records are small tuples, and the ones without a play date (e.g.
+    every unplayed item) are shared, so most entries cost one dict slot.
+    Used internally by `ObjectCache`, which holds the lock.
+    '''
+    def __init__(self):
+        self._users	= {}
+        self._shared	= {}
+
+    def __len__(self):
+        return sum(len(items) for items in self._users.values())
+
+    @property
+    def users(self):
+        '''ids of the users with stored user data'''
+        return list(self._users)
+
+    def set(self, user_id, item_id, data):
+        '''store the user data json of an item for a user'''
+        record = UserData(
+            bool(data.get('Played')),
+            data.get('PlayCount') or 0,
+            data.get('PlaybackPositionTicks') or 0,
+            bool(data.get('IsFavorite')),
+            data.get('LastPlayedDate'),
+        )
+        self._store(user_id, item_id, record)
+
+    def update(self, user_id, item_id, **fields):
+        '''change some fields of an item's user data (e.g. `played=True`)
+
+        Nothing is stored for items without user data yet, as the other
+        fields would be unknown.
+        '''
+        record = self.get(user_id, item_id, None)
+        if record is not None:
+            self._store(user_id, item_id, record._replace(**fields))
+
+    def _store(self, user_id, item_id, record):
+        if record.last_played is None:
+            record = self._shared.setdefault(record, record)
+        self._users.setdefault(user_id, {})[item_id] = record
+
+    def get(self, user_id, item_id, default=EMPTY_USER_DATA):
+        '''user data of an item (`default` if unknown)'''
+        return self._users.get(user_id, {}).get(item_id, default)
+
+    def remove(self, item_id):
+        '''drop an item for every user'''
+        for items in self._users.values():
+            items.pop(item_id, None)
+
+    def clear(self, user_id=None):
+        '''drop everything stored for one user (or all users)'''
+        if user_id is None:
+            self._users.clear()
+            self._shared.clear()
+        else:
+            self._users.pop(user_id, None)
+
+    def memory_usage(self):
+        '''approximate number of bytes used'''
+        size = sys.getsizeof(self._users) + sys.getsizeof(self._shared)
+        records = set()
+        for items in self._users.values():
+            size += sys.getsizeof(items)
+            records.update(map(id, items.values()))
+        return size + len(records) * sys.getsizeof(EMPTY_USER_DATA)
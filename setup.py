@@ -30,6 +30,10 @@ setup(
       'embypy.objects': embypy_objs
     },
     install_requires=requirements,
+    extras_require={
+      'fast': ['msgspec'],
+      'table': ['numpy', 'pyarrow'],
+    },
     packages=['embypy', 'embypy.objects', 'embypy.utils'],
     classifiers=[
       'Development Status :: 4 - Beta',
@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+
+
+class FakeServer:
+    '''minimal emby server on localhost, counting the requests it gets
+
+    `routes` maps (method, path) to async handlers, the defaults answer
+    logins, the server info and item listings of `items`.
+    '''
+    def __init__(self, items=(), token='token', user_id='u'):
+        self.items	= list(items)
+        self.token	= token
+        self.user_id	= user_id
+        self.logins	= 0
+        self.hits	= {}
+        self.latency	= 0
+        self.routes	= {
+            ('POST', '/Users/AuthenticateByName'):	self.authenticate,
+            ('GET', '/system/info/public'):		self.info,
+            ('GET', f'/Users/{user_id}/Items'):		self.list_items,
+        }
+        self.url	= None
+        self._runner	= None
+
+    def authorized(self, request):
+        return self.token in (
+            request.headers.get('X-MediaBrowser-Token'),
+            request.query.get('api_key'),
+        )
+
+    async def authenticate(self, request):
+        self.logins += 1
+        await asyncio.sleep(0.01)
+        return web.json_response(
+            {'AccessToken': self.token, 'User': {'Id': self.user_id}}
+        )
+
+    async def info(self, request):
+        return web.json_response(
+            {'Version': '4.7.0.0', 'ProductName': 'Emby Server'}
+        )
+
+    async def list_items(self, request):
+        if not self.authorized(request):
+            return web.Response(status=401)
+        await asyncio.sleep(self.latency)
+        start = int(request.query.get('startIndex', 0))
+        limit = int(request.query.get('limit', 200))
+        return web.json_response({
+            'Items': self.items[start:start + limit],
+            'TotalRecordCount': len(self.items),
+        })
+
+    async def handle(self, request):
+        key = (request.method, request.path)
+        self.hits[key] = self.hits.get(key, 0) + 1
+        handler = self.routes.get(key)
+        if handler is None:
+            return web.Response(status=404)
+        return await handler(request)
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_route('*', '/{tail:.*}', self.handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, 'localhost', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f'http://localhost:{port}'
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._runner.cleanup()
+
+
+def movie(i):
+    return {'Id': '{:032x}'.format(i), 'Type': 'Movie', 'Name': f'm{i:04}'}
+
+
+@pytest.fixture
+def run():
+    '''run a coroutine function on a new event loop'''
+    def run(func):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            return loop.run_until_complete(func())
+        finally:
+            loop.close()
+    return run
@@ -0,0 +1,62 @@
+from aiohttp import web
+
+from embypy import Emby
+
+from conftest import FakeServer, movie
+
+
+def emby_for(server):
+    return Emby(server.url, api_key='token', userid='u', device_id='test')
+
+
+def mark_routes(server, ids, kind):
+    async def ok(request):
+        return web.json_response({})
+    for i in ids:
+        for method in ('POST', 'DELETE'):
+            path = f'/Users/{server.user_id}/{kind}/{i}'
+            server.routes[(method, path)] = ok
+
+
+def sent(server, method):
+    return sum(hits for (m, _), hits in server.hits.items() if m == method)
+
+
+def test_unknown_user_data_is_not_skipped(run):
+    ids = [movie(i)['Id'] for i in range(3)]
+
+    async def main():
+        async with FakeServer() as server:
+            mark_routes(server, ids, 'PlayedItems')
+            mark_routes(server, ids, 'FavoriteItems')
+            emby = emby_for(server)
+            watched = await emby.mark_watched(ids, value=False)
+            favorite = await emby.mark_favorite(ids, False, user_id='u')
+            return (
+                [r.value for r in watched + favorite],
+                sent(server, 'DELETE'),
+            )
+
+    statuses, deletes = run(main)
+    assert 304 not in statuses
+    assert deletes == 6
+
+
+def test_loaded_user_data_is_skipped(run):
+    data = [
+        dict(movie(i), UserData={'Played': i < 2, 'IsFavorite': False})
+        for i in range(3)
+    ]
+
+    async def main():
+        async with FakeServer() as server:
+            ids = [item['Id'] for item in data]
+            mark_routes(server, ids, 'PlayedItems')
+            emby = emby_for(server)
+            await emby.process(data, 'u')
+            results = await emby.mark_watched(ids)
+            return [r.value for r in results], sent(server, 'POST')
+
+    statuses, posts = run(main)
+    assert statuses[:2] == [304, 304] and statuses[2] != 304
+    assert posts == 1
@@ -0,0 +1,110 @@
+import gc
+import time
+
+from embypy.objects import EmbyObject
+from embypy.utils import Connector
+
+from conftest import movie
+
+
+def connector(**kargs):
+    return Connector(
+        'http://localhost', api_key='token', userid='u', device_id='test',
+        **kargs
+    )
+
+
+def cached_movies(conn, count):
+    items = []
+    for i in range(count):
+        data = dict(movie(i), ParentId='p', Path=f'/m/{i}.mkv')
+        obj = EmbyObject(data, conn)
+        conn.known_objects.set_user_data('u', obj.id, {'Played': True})
+        items.append(obj)
+    return items
+
+
+def test_weak_mode_forgets_collected_objects():
+    conn = connector(cache='weak', search_index=True)
+    cache = conn.known_objects
+    items = cached_movies(conn, 100)
+    assert len(cache.index._entries) == 100
+    assert len(cache.user_data) == 100
+    assert len(cache.search) == 100
+
+    del items
+    gc.collect()
+    assert len(cache) == 0
+    assert len(cache.index._entries) == 0
+    assert len(cache.user_data) == 0
+    assert len(cache.search) == 0
+
+
+def test_weak_mode_keeps_entries_of_a_replacement():
+    conn = connector(cache='weak')
+    cache = conn.known_objects
+    old = EmbyObject(movie(1), conn)
+    cache.pop(old.id)
+    new = EmbyObject(dict(movie(1), ParentId='p'), conn)
+    del old
+    gc.collect()
+    assert cache.get(new.id) is new
+    assert cache.find('parent', 'p') == [new]
+
+
+def played(obj):
+    return obj.watched, obj.favorite, obj.play_count
+
+
+def test_evicted_objects_keep_their_user_data():
+    conn = connector(cache_size=2)
+    cache = conn.known_objects
+    items = []
+    for i in range(3):
+        obj = EmbyObject(movie(i), conn)
+        cache.set_user_data(
+            'u', obj.id, {'Played': True, 'IsFavorite': True, 'PlayCount': 2}
+        )
+        items.append(obj)
+    assert cache.get(items[0].id) is None
+    assert played(items[0]) == (True, True, 2)
+
+    first = items[0].id
+    del items[0], obj
+    gc.collect()
+    assert cache.get_user_data('u', first, None) is None
+    assert played(items[1]) == (True, True, 2)
+
+
+def test_expired_objects_keep_their_user_data():
+    conn = connector(cache_ttl=0.01)
+    cache = conn.known_objects
+    obj = EmbyObject(movie(1), conn)
+    cache.set_user_data('u', obj.id, {'Played': True})
+    time.sleep(0.02)
+    assert cache.get(obj.id) is None
+    assert obj.watched
+
+    item_id = obj.id
+    del obj
+    gc.collect()
+    assert cache.get_user_data('u', item_id, None) is None
+
+
+def test_merge_only_reindexes_changed_index_fields(run):
+    conn = connector()
+    cache = conn.known_objects
+    obj = EmbyObject(dict(movie(1), ParentId='p'), conn)
+    added = []
+    add = cache.index.add
+    cache.index.add = lambda *args: added.append(args) or add(*args)
+
+    async def main():
+        await obj.process(dict(movie(1), ParentId='p', Overview='new'))
+        unchanged = len(added)
+        await obj.process(dict(movie(1), ParentId='q'))
+        return unchanged, len(added)
+
+    assert run(main) == (0, 1)
+    assert cache.find('parent', 'q') == [obj]
+    assert cache.find('parent', 'p') == []
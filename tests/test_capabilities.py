@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from embypy import Emby
+from embypy.utils import Deadline, DeadlineExceeded
+
+from conftest import FakeServer
+
+
+def test_probe_is_sent_once(run):
+    async def main():
+        async with FakeServer() as server:
+            emby = Emby(
+                server.url, api_key='token', userid='u', device_id='test',
+            )
+            found = await asyncio.gather(
+                *(emby.connector.capabilities for _ in range(10))
+            )
+            assert found[0].flavor == 'emby'
+            assert found[0].supports('optional_total_count')
+            return server.hits[('GET', '/system/info/public')]
+
+    assert run(main) == 1
+
+
+def test_probe_outlives_caller_deadline(run):
+    async def main():
+        async with FakeServer() as server:
+            async def slow_info(request):
+                await asyncio.sleep(0.2)
+                return web.json_response({'Version': '10.8.13'})
+            server.routes[('GET', '/system/info/public')] = slow_info
+            emby = Emby(
+                server.url, api_key='token', userid='u', device_id='test',
+            )
+            with pytest.raises(DeadlineExceeded):
+                async with Deadline(0.05):
+                    await emby.connector.capabilities
+            # the probe kept running without the deadline
+            return (await emby.connector.capabilities).flavor
+
+    assert run(main) == 'jellyfin'
+
+
+def test_failed_probe_falls_back(run):
+    async def main():
+        async with FakeServer() as server:
+            async def broken(request):
+                return web.Response(status=500, text='oops')
+            server.routes[('GET', '/system/info/public')] = broken
+            emby = Emby(
+                server.url, api_key='token', userid='u', device_id='test',
+            )
+            found = await emby.connector.capabilities
+            jellyfin = await emby.connector.is_jellyfin
+            return found.flavor, found.features, jellyfin
+
+    assert run(main) == ('unknown', frozenset(), False)
+
+
+def test_probe_is_kept_across_loops_without_keeping_loops(run):
+    async def probe():
+        async with FakeServer() as server:
+            emby = Emby(
+                server.url, api_key='token', userid='u', device_id='test',
+            )
+            await emby.connector.capabilities
+            await asyncio.sleep(0)
+            return emby
+
+    emby = run(probe)
+    conn = emby.connector
+    assert (conn._probe_tasks, conn._request_limits) == ({}, {})
+
+    async def again():
+        # no server: the result of the first loop is reused
+        return (await conn.capabilities).flavor
+
+    assert run(again) == 'emby'
+    assert conn._probe_tasks == {}
@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from embypy import Emby
+from embypy.utils import Deadline, DeadlineExceeded
+
+from conftest import FakeServer, movie
+
+
+def test_first_request_logs_in_under_deadline(run):
+    async def main():
+        async with FakeServer([movie(i) for i in range(50)]) as server:
+            emby = Emby(
+                server.url, username='user', password='pw',
+                device_id='test',
+            )
+            async with Deadline(3):
+                movies = await emby.movies_force
+            return server.logins, len(movies)
+
+    assert run(main) == (1, 50)
+
+
+def test_partial_listing_is_not_cached(run):
+    async def main():
+        async with FakeServer([movie(i) for i in range(1000)]) as server:
+            server.latency = 0.1
+            emby = Emby(
+                server.url, api_key='token', userid='u', device_id='test',
+            )
+            async with Deadline(0.35, partial=True) as limit:
+                movies = await emby.movies_force
+            assert limit.expired
+            assert 0 < len(movies) < 1000
+            assert 'movies' not in (emby._extras or {})
+
+            with pytest.raises(DeadlineExceeded):
+                async with Deadline(0.05):
+                    await emby.movies_force
+
+    run(main)
+
+
+def test_partial_music_crawl_is_not_cached(run):
+    artist = {'Id': 'a' * 32, 'Type': 'MusicArtist', 'Name': 'artist'}
+    songs = [
+        {**movie(i), 'Type': 'Audio', 'ArtistItems': [{'Id': artist['Id']}]}
+        for i in range(1000)
+    ]
+
+    async def main():
+        async with FakeServer() as server:
+            async def items(request):
+                found = {
+                    'MusicArtist': [artist], 'MusicAlbum': [], 'Audio': songs,
+                }[request.query['includeItemTypes']]
+                if found is songs:
+                    await asyncio.sleep(0.1)
+                start = int(request.query['startIndex'])
+                limit = int(request.query['limit'])
+                return web.json_response({
+                    'Items': found[start:start + limit],
+                    'TotalRecordCount': len(found),
+                })
+
+            server.routes[('GET', '/Users/u/Items')] = items
+            emby = Emby(
+                server.url, api_key='token', userid='u', device_id='test',
+            )
+            async with Deadline(0.25, partial=True) as limit:
+                artists = await emby.load_music()
+            assert limit.expired
+            assert [a.id for a in artists] == [artist['Id']]
+            assert 'songs' not in (artists[0]._extras or {})
+            for key in ('artists', 'albums', 'songs'):
+                assert key not in (emby._extras or {})
+
+            artists = await emby.load_music()
+            assert len(artists[0].extras['songs']) == 1000
+            assert len(emby.extras['songs']) == 1000
+
+    run(main)
+
+
+def test_expired_hierarchy_is_not_cached(run):
+    series_id = 'b' * 32
+
+    async def main():
+        async with FakeServer() as server:
+            async def seasons(request):
+                return web.json_response({'Items': [
+                    {'Id': 'c' * 32, 'Type': 'Season', 'IndexNumber': 1},
+                ]})
+
+            async def episodes(request):
+                await asyncio.sleep(0.5)
+                return web.json_response({'Items': []})
+
+            shows = f'/Shows/{series_id}'
+            server.routes[('GET', shows + '/Seasons')] = seasons
+            server.routes[('GET', shows + '/Episodes')] = episodes
+            emby = Emby(
+                server.url, api_key='token', userid='u', device_id='test',
+            )
+            series = await emby.process(
+                {'Id': series_id, 'Type': 'Series', 'Name': 'show'}
+            )
+            with pytest.raises(DeadlineExceeded):
+                async with Deadline(0.2):
+                    await series.load_hierarchy()
+            assert 'seasons' not in (series._extras or {})
+            assert 'episodes' not in (series._extras or {})
+
+    run(main)
+
+
+def test_partial_facet_is_not_cached(run):
+    async def main():
+        async with FakeServer([movie(i) for i in range(1000)]) as server:
+            server.latency = 0.1
+            server.routes[('GET', '/Genres')] = server.list_items
+            emby = Emby(
+                server.url, api_key='token', userid='u', device_id='test',
+            )
+            async with Deadline(0.25, partial=True) as limit:
+                genres = await emby.get_genres()
+            assert limit.expired
+            assert len(genres) < 1000
+            assert not emby._facet_cache
+
+    run(main)
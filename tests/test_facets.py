@@ -0,0 +1,23 @@
+from embypy import Emby
+
+from conftest import FakeServer
+
+
+def tag(i):
+    return {'Id': '{:032x}'.format(i), 'Type': 'Tag', 'Name': f't{i:04}'}
+
+
+def test_tags_are_paged(run):
+    async def main():
+        async with FakeServer([tag(i) for i in range(1000)]) as server:
+            server.routes[('GET', '/Tags')] = server.list_items
+            emby = Emby(
+                server.url, api_key='token', userid='u', device_id='test',
+            )
+            tags = await emby.get_tags('Movie')
+            again = await emby.get_tags('Movie')
+            return tags, again, server.hits[('GET', '/Tags')]
+
+    tags, again, hits = run(main)
+    assert tags == again == [f't{i:04}' for i in range(1000)]
+    assert hits > 1
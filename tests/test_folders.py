@@ -0,0 +1,125 @@
+import asyncio
+
+from aiohttp import web
+
+from embypy import Emby
+
+from conftest import FakeServer
+
+
+def item_id(i):
+    return '{:032x}'.format(i)
+
+
+def song(i):
+    return {'Id': item_id(i), 'Type': 'Audio', 'Name': f's{i:02}'}
+
+
+def test_playlist_songs_include_artist_songs(run):
+    artist = {'Id': item_id(100), 'Type': 'MusicArtist', 'Name': 'artist'}
+    playlist_id = item_id(200)
+
+    async def entries(request):
+        return web.json_response(
+            {'Items': [song(1), artist], 'TotalRecordCount': 2}
+        )
+
+    async def items(request):
+        # the artist has no children, its songs are listed by ArtistIds
+        if request.query.get('ArtistIds') != artist['Id']:
+            return web.json_response({'Items': [], 'TotalRecordCount': 0})
+        return web.json_response(
+            {'Items': [song(2), song(3)], 'TotalRecordCount': 2}
+        )
+
+    async def main():
+        async with FakeServer() as server:
+            server.routes[('GET', f'/Playlists/{playlist_id}/Items')] = entries
+            server.routes[('GET', '/Users/u/Items')] = items
+            emby = Emby(
+                server.url, api_key='token', userid='u', device_id='test',
+            )
+            playlist = await emby.process(
+                {'Id': playlist_id, 'Type': 'Playlist', 'Name': 'test'}
+            )
+            return [item.name for item in await playlist.songs]
+
+    assert run(main) == ['s01', 's02', 's03']
+
+
+def test_walk_waits_for_cancelled_listings(run):
+    root_id = item_id(300)
+
+    async def items(request):
+        if request.query.get('parentId') != root_id:
+            # subfolders never answer
+            await asyncio.sleep(10)
+        folders = [
+            {'Id': item_id(i), 'Type': 'Folder', 'Name': f'f{i}'}
+            for i in range(3)
+        ]
+        return web.json_response(
+            {'Items': [*folders, song(10)], 'TotalRecordCount': 4}
+        )
+
+    def listings():
+        return [
+            task for task in asyncio.all_tasks()
+            if 'walk.<locals>.visit' in task.get_coro().__qualname__
+        ]
+
+    async def main():
+        async with FakeServer() as server:
+            server.routes[('GET', '/Users/u/Items')] = items
+            emby = Emby(
+                server.url, api_key='token', userid='u', device_id='test',
+            )
+            root = await emby.process(
+                {'Id': root_id, 'Type': 'Folder', 'Name': 'root'}
+            )
+            walk = root.walk(types='Audio')
+            first = await walk.__anext__()
+            running = len(listings())
+            await walk.aclose()
+            return first.name, running, listings()
+
+    assert run(main) == ('s10', 3, [])
+
+
+def test_hierarchy_groups_episodes_by_season_id(run):
+    series_id = item_id(400)
+    seasons = [
+        {'Id': item_id(401 + i), 'Type': 'Season', 'Name': name}
+        for i, name in enumerate(['Specials', 'Extras'])
+    ]
+    episodes = [
+        {'Id': item_id(410), 'Type': 'Episode', 'Name': 'e1',
+         'SeasonId': seasons[0]['Id'], 'IndexNumber': 1},
+        {'Id': item_id(411), 'Type': 'Episode', 'Name': 'e2',
+         'ParentId': seasons[1]['Id'], 'IndexNumber': 1},
+    ]
+
+    def listing(items):
+        async def respond(request):
+            return web.json_response(
+                {'Items': items, 'TotalRecordCount': len(items)}
+            )
+        return respond
+
+    async def main():
+        async with FakeServer() as server:
+            shows = f'/Shows/{series_id}'
+            server.routes[('GET', shows + '/Seasons')] = listing(seasons)
+            server.routes[('GET', shows + '/Episodes')] = listing(episodes)
+            emby = Emby(
+                server.url, api_key='token', userid='u', device_id='test',
+            )
+            series = await emby.process(
+                {'Id': series_id, 'Type': 'Series', 'Name': 'show'}
+            )
+            return {
+                season.name: [item.name for item in await season.episodes]
+                for season in await series.load_hierarchy()
+            }
+
+    assert run(main) == {'Specials': ['e1'], 'Extras': ['e2']}
@@ -0,0 +1,29 @@
+from embypy.utils.hedge import Hedger, route
+
+
+def item_id(i):
+    return '{:032x}'.format(i)
+
+
+def test_route_replaces_ids():
+    assert route(f'Users/{{UserId}}/Items/{item_id(7)}') == \
+        '/Users/{UserId}/Items/{id}'
+    assert route('/Shows/12/Seasons') == '/Shows/{id}/Seasons'
+    assert route('/Items/1b4e28ba-2fa1-11d2-883f-0016d3cca427/Images') == \
+        '/Items/{id}/Images'
+
+
+def test_item_paths_share_latencies():
+    hedger = Hedger(min_samples=20)
+    for i in range(20):
+        hedger.record(f'/Users/{{UserId}}/Items/{item_id(i)}', 0.01)
+    assert hedger.delay(f'/Users/{{UserId}}/Items/{item_id(99)}') == 0.05
+    assert len(hedger._latencies) == 1
+
+
+def test_routes_are_capped():
+    hedger = Hedger(max_routes=10)
+    for i in range(100):
+        hedger.record(f'/route{i}/Items', 0.01)
+    assert len(hedger._latencies) == 10
+    assert '/route99/Items' in hedger._latencies
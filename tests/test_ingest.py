@@ -0,0 +1,19 @@
+import sys
+
+from embypy.utils.ingest import Ingester
+
+
+def test_ingest_changes_dicts_in_place():
+    ingest = Ingester(prune_fields=['MediaSources'], compact_ids=True)
+    parent = 'ab' * 16
+    item = {
+        'Id': 'cd' * 16, 'ParentId': bytes.fromhex(parent), 'Type': 'Movie',
+        'Genres': ['Drama'], 'MediaSources': [{}],
+    }
+    genres = item['Genres']
+    assert ingest(item) is item
+    assert 'MediaSources' not in item
+    assert item['Id'] == bytes.fromhex('cd' * 16)
+    assert item['ParentId'] == bytes.fromhex(parent)
+    assert item['Genres'] is genres
+    assert item['Type'] is sys.intern('Movie')
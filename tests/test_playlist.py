@@ -0,0 +1,107 @@
+import pytest
+from aiohttp import web
+
+from embypy import Emby
+
+from conftest import FakeServer
+
+
+def item_id(i):
+    return '{:032x}'.format(i)
+
+
+class Playlist:
+    '''entries of one playlist, rejecting requests that contain `bad`'''
+    def __init__(self, server, count, bad=None):
+        self.entries = [(f'e{i}', item_id(i)) for i in range(count)]
+        self.next = count
+        self.bad = bad
+        self.id = item_id(10**6)
+        path = f'/Playlists/{self.id}/Items'
+        server.routes[('GET', path)] = self.get
+        server.routes[('POST', path)] = self.post
+        server.routes[('DELETE', path)] = self.delete
+
+    async def get(self, request):
+        start = int(request.query.get('StartIndex', 0))
+        limit = int(request.query.get('Limit', 200))
+        return web.json_response({
+            'Items': [
+                {'Id': i, 'PlaylistItemId': e, 'Type': 'Audio', 'Name': i}
+                for e, i in self.entries[start:start + limit]
+            ],
+            'TotalRecordCount': len(self.entries),
+        })
+
+    async def post(self, request):
+        ids = (await request.json())['Ids'].split(',')
+        if self.bad in ids:
+            return web.Response(status=500)
+        for i in ids:
+            self.entries.append((f'e{self.next}', i))
+            self.next += 1
+        return web.Response(status=204)
+
+    async def delete(self, request):
+        entries = set(request.query['EntryIds'].split(','))
+        if self.bad in entries:
+            return web.Response(status=500)
+        self.entries = [e for e in self.entries if e[0] not in entries]
+        return web.Response(status=204)
+
+
+async def setup(server, count, bad=None):
+    playlist = Playlist(server, count, bad)
+    emby = Emby(server.url, api_key='token', userid='u', device_id='test')
+    obj = await emby.process(
+        {'Id': playlist.id, 'Type': 'Playlist', 'Name': 'test'}
+    )
+    return playlist, obj
+
+
+def test_sync(run):
+    async def main():
+        async with FakeServer() as server:
+            playlist, obj = await setup(server, 10)
+            wanted = [item_id(i) for i in range(3, 15)]
+            diff = await obj.sync(wanted, chunk_size=2)
+            return playlist.entries, diff
+
+    entries, diff = run(main)
+    assert [i for _, i in entries] == [item_id(i) for i in range(3, 15)]
+    assert diff.added == [item_id(i) for i in range(10, 15)]
+    assert [item.id for item in diff.removed] == [item_id(i) for i in range(3)]
+
+
+def test_sync_reports_failed_chunks(run):
+    async def main():
+        async with FakeServer() as server:
+            # the chunk with entry e2 can not be removed
+            playlist, obj = await setup(server, 10, bad='e2')
+            wanted = [item_id(i) for i in range(4, 15)]
+            with pytest.raises(RuntimeError) as error:
+                await obj.sync(wanted, chunk_size=2)
+            return playlist.entries, error.value.args
+
+    entries, (message, diff, failed) = run(main)
+    # chunk [e2, e3] was rejected, [e0, e1] went through
+    assert [i for _, i in entries][:2] == [item_id(2), item_id(3)]
+    assert [item.id for item in diff.removed] == [item_id(0), item_id(1)]
+    assert diff.added == [item_id(i) for i in range(10, 15)]
+    assert failed == [('remove', ['e2', 'e3'], 500)]
+
+
+def test_failed_append_stops_later_chunks(run):
+    async def main():
+        async with FakeServer() as server:
+            playlist, obj = await setup(server, 0, bad=item_id(2))
+            with pytest.raises(RuntimeError) as error:
+                await obj.add_items(
+                    *(item_id(i) for i in range(6)), chunk_size=2
+                )
+            return playlist.entries, error.value.args
+
+    entries, (message, diff, failed) = run(main)
+    assert [i for _, i in entries] == [item_id(0), item_id(1)]
+    assert diff.added == [item_id(0), item_id(1)]
+    assert failed == [('add', [item_id(2), item_id(3)], 500)]
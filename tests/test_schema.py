@@ -0,0 +1,69 @@
+import json
+
+import pytest
+from aiohttp import web
+
+from embypy import Emby
+
+from conftest import FakeServer, movie
+
+msgspec = pytest.importorskip('msgspec')
+
+from embypy.utils.schema import Item, typed_loads  # noqa: E402
+
+
+def listing(*items):
+    return json.dumps({'Items': list(items), 'TotalRecordCount': len(items)})
+
+
+def test_typed_loads_decodes_items_into_structs():
+    item = dict(
+        movie(1), CommunityRating='7.5', Path='/m/1.mkv', ServerId='s',
+        Genres=['Drama'],
+    )
+    other = {'Id': 'x', 'Type': 'Unknown', 'Name': 'x'}
+    broken = dict(movie(2), RunTimeTicks='long')
+    data = typed_loads(listing(item, other, broken))
+
+    typed, untyped, fallback = data['Items']
+    assert data['TotalRecordCount'] == 3
+    assert isinstance(typed, Item) and type(typed).__name__ == 'Movie'
+    assert typed['CommunityRating'] == 7.5
+    assert typed.get('ServerId') == 's' and typed['Type'] == 'Movie'
+    assert dict(typed) == dict(item, CommunityRating=7.5)
+    assert untyped == other and fallback == broken
+
+
+def test_typed_items_merge_and_send_every_key(run):
+    async def main():
+        async with FakeServer() as server:
+            posted = []
+
+            async def receive(request):
+                posted.append(json.loads(await request.text()))
+                return web.Response(status=204)
+
+            item = dict(movie(1), Genres=['a'], ServerId='s')
+            server.routes[('POST', '/Items/' + item['Id'])] = receive
+            emby = Emby(
+                server.url, api_key='token', userid='u', device_id='test',
+                typed=True,
+            )
+            load = emby.connector.loads
+            obj = await emby.process(load(listing(item))['Items'][0])
+            state = obj.name, obj.genres, obj.object_dict.get('ServerId')
+            await emby.process(
+                load(listing(dict(item, Name='new', Path='/p')))['Items'][0]
+            )
+            unsent = await obj.send()
+            obj.genres.append('b')
+            await obj.send()
+            return state, obj, unsent, posted
+
+    state, obj, unsent, posted = run(main)
+    assert state == ('m0001', ['a'], 's')
+    assert obj.name == 'new'
+    assert unsent == (304, '')
+    assert len(posted) == 1
+    assert posted[0]['Genres'] == ['a', 'b']
+    assert posted[0]['ServerId'] == 's' and posted[0]['Path'] == '/p'
@@ -0,0 +1,31 @@
+from embypy.objects import EmbyObject
+
+from conftest import movie
+from test_cache import connector
+
+
+def indexed_movies(count):
+    conn = connector(search_index=True)
+    items = [EmbyObject(movie(i), conn) for i in range(count)]
+    conn.known_objects.mark_complete('Movie')
+    return conn.known_objects, items
+
+
+def test_clear_resets_complete_types():
+    cache, items = indexed_movies(3)
+    assert cache.search.complete_types == {'Movie'}
+    cache.clear()
+    assert cache.search.complete_types == set()
+
+
+def test_discard_resets_complete_type():
+    cache, items = indexed_movies(3)
+    cache.pop(items[0].id)
+    assert 'Movie' not in cache.search.complete_types
+
+
+def test_setter_reindexes_name():
+    cache, items = indexed_movies(3)
+    items[1].name = 'The Matrix'
+    assert cache.search_items('matrix') == [items[1]]
+    assert items[1] not in cache.search_items('m0001')
@@ -0,0 +1,112 @@
+import json
+
+from aiohttp import web
+
+from embypy import Emby
+
+from conftest import FakeServer, movie
+
+
+async def setup(server, **fields):
+    posted = []
+
+    async def receive(request):
+        posted.append(json.loads(await request.text()))
+        return web.Response(status=204)
+
+    item = dict(movie(1), Tags=['a'], **fields)
+    server.routes[('POST', '/Items/' + item['Id'])] = receive
+    emby = Emby(server.url, api_key='token', userid='u', device_id='test')
+    obj = await emby.process(dict(item, Tags=list(item['Tags'])))
+    return emby, obj, item, posted
+
+
+def test_unchanged_object_is_not_sent(run):
+    async def main():
+        async with FakeServer() as server:
+            emby, obj, item, posted = await setup(server)
+            return await obj.send(), posted
+
+    assert run(main) == ((304, ''), [])
+
+
+def test_in_place_changes_are_sent(run):
+    async def main():
+        async with FakeServer() as server:
+            emby, obj, item, posted = await setup(server)
+            obj.tags.append('b')
+            status, _ = await obj.send()
+            again = await obj.send()
+            return status, posted, again
+
+    status, posted, again = run(main)
+    assert status == 204
+    assert [p['Tags'] for p in posted] == [['a', 'b']]
+    assert again == (304, '')
+
+
+def test_refetch_keeps_pending_edits(run):
+    async def main():
+        async with FakeServer() as server:
+            emby, obj, item, posted = await setup(server, Overview='old')
+            obj.name = 'renamed'
+            obj.overview = 'mine'
+            # the server still has the old name, but a new overview
+            await emby.process(dict(item, Overview='theirs'))
+            state = obj.name, obj.overview, obj.dirty
+            status, _ = await obj.send()
+            return state, status, posted
+
+    state, status, posted = run(main)
+    assert state == ('renamed', 'theirs', frozenset({'Name'}))
+    assert status == 204
+    assert posted[0]['Name'] == 'renamed'
+
+
+def test_send_many_posts_each_object_once(run):
+    async def main():
+        async with FakeServer() as server:
+            emby = Emby(
+                server.url, api_key='token', userid='u', device_id='test',
+            )
+
+            async def receive(request):
+                return web.Response(status=204)
+
+            items = []
+            for i in range(10):
+                item = movie(i)
+                server.routes[('POST', '/Items/' + item['Id'])] = receive
+                items.append(await emby.process(item))
+            for item in items[3:]:
+                item.name = 'changed'
+
+            results = await emby.send_many(items + items[5:])
+            posts = {
+                path: hits for (method, path), hits in server.hits.items()
+                if method == 'POST'
+            }
+            return results, posts, await emby.connector.capabilities
+
+    results, posts, capabilities = run(main)
+    assert [r.value[0] for r in results] == [304] * 3 + [204] * 12
+    assert sorted(posts.values()) == [1] * 7
+    assert capabilities.send_raw is True
+
+    saved = Emby(
+        'http://localhost', api_key='token', userid='u', device_id='test',
+        capabilities=capabilities.as_dict(),
+    )
+    assert saved.connector.send_raw is True
+
+
+def test_unedited_objects_are_not_fingerprinted(run):
+    async def main():
+        async with FakeServer() as server:
+            emby, obj, item, posted = await setup(server)
+            await emby.process(dict(item, Name='theirs'))
+            untouched = obj._fingerprint is None
+            obj.name = 'mine'
+            return untouched, obj._fingerprint is not None, obj.dirty
+
+    assert run(main) == (True, True, frozenset({'Name'}))